@@ -17,22 +17,22 @@ import logging
 import os
 from pathlib import Path
 import json
-import yaml
-
-import boto3
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import quickhost
 from quickhost import QHExit, CliResponse
 
 from .AWSResource import AWSResourceBase
-from .AWSIam import Iam
-from .AWSSG import SG
-from .AWSHost import AWSHost
-from .AWSKeypair import KP
-from .AWSNetworking import AWSNetworking
 from .constants import AWSConstants
+from .scheduler import scheduler
+from .taskgraph import TaskGraph, TaskGraphError
 from .utilities import QuickhostUnauthorized, Arn
 
+# NOTE: The resource modules (and through them boto3, botocore, cryptography
+# and yaml) are imported inside the actions that use them. The quickhost CLI
+# calls load_plugin() for every invocation, including --help and shell
+# completion, so nothing expensive may be imported at module level here.
+
 logger = logging.getLogger(__name__)
 
 
@@ -53,8 +53,8 @@ class AWSApp(quickhost.AppBase, AWSResourceBase):
 
     def __init__(self, app_name):
         self.app_name = app_name
-        self._client = boto3.client('ec2')
-        self._ec2_resource = boto3.resource('ec2')
+        self.region = AWSConstants.DEFAULT_REGION
+        self.profile = AWSConstants.DEFAULT_IAM_USER
         self.userdata = None
         self.ssh_key_filepath = None
         self.ami = None
@@ -66,29 +66,46 @@ class AWSApp(quickhost.AppBase, AWSResourceBase):
         self.dry_run = None
         self.vpc_id = None
         self.subnet_id = None
+        self.subnet_ids = []
         self.sgid = None
         # self.load_default_config()
 
+    @property
+    def client(self):
+        """ec2 client for the app's profile and region, created on first use"""
+        return self._get_client('ec2', profile=self.profile, region=self.region)
+
+    @property
+    def ec2(self):
+        """ec2 resource for the app's profile and region, created on first use"""
+        return self._get_resource('ec2', profile=self.profile, region=self.region)
+
     def load_default_config(self, cache_ok=True, region=AWSConstants.DEFAULT_REGION, profile=AWSConstants.DEFAULT_IAM_USER):
         logger.debug("load default config")
+        from .AWSNetworking import AWSNetworking
         networking_params = AWSNetworking(
             app_name=self.app_name,
             region=region,
             profile=profile
         ).describe(use_cache=cache_ok)
         logger.debug("networking params: {}".format(networking_params))
-        session: boto3.Session = boto3.session.Session(profile_name=profile, region_name=region)
-        sts_client = session.client('sts')
-
-        caller_info = sts_client.get_caller_identity()
-        _ = caller_info.pop('ResponseMetadata')
+        self.region = region
+        self.profile = profile
+        caller_info = self._get_caller_identity(profile=profile, region=region)
         self.vpc_id = networking_params['vpc_id']
         self.subnet_id = networking_params['subnet_id']
+        # cached before multi-az support, there's only the one subnet
+        self.subnet_ids = networking_params.get('subnet_ids') or [self.subnet_id]
         calling_user_arn = Arn(caller_info['Arn'])
         self.user = calling_user_arn.resource
         self.account = calling_user_arn.account
         return networking_params
 
+    def _log_api_calls(self):
+        """see AWSHost.InstanceSnapshot for the expected numbers"""
+        for (service, operation), count in sorted(scheduler.call_counts.items()):
+            logger.debug(f"{service}:{operation} called {count} times")
+
     def _print_loaded_args(self, d: dict, heading=None) -> None:
         if d is None:
             logger.warning("No items to print!")
@@ -121,6 +138,8 @@ class AWSApp(quickhost.AppBase, AWSResourceBase):
         TODO: @@@ all regions
         """
         logger.debug("plugin destroy")
+        from .AWSIam import Iam
+        from .AWSNetworking import AWSNetworking
         logger.debug("plugin destroy args {}".format(plugin_destroy_args))
         params = {
             "app_name": "uninstall-quickhost-aws",
@@ -129,8 +148,7 @@ class AWSApp(quickhost.AppBase, AWSResourceBase):
             "profile": plugin_destroy_args['profile'],
         }
         session = self._get_session(region=params['region'], profile=params['profile'])
-        sts = session.client('sts')
-        whoami = sts.get_caller_identity()
+        whoami = self._get_caller_identity(region=params['region'], profile=params['profile'])
         whoami['username'] = self._get_user_name_from_arn(whoami['Arn'])
         whoami['region'] = session.region_name
         whoami['profile'] = session.profile_name
@@ -142,9 +160,9 @@ class AWSApp(quickhost.AppBase, AWSResourceBase):
         if not inp.lower() == ('y' or 'yes'):
             return CliResponse(None, 'aborted', QHExit.ABORTED)
         logger.info("destroying remaining apps")
-        AWSApp.destroy_all()
+        AWSApp.destroy_all({'region': [params['region']], 'profile': params['profile']})
         logger.info("destroying networking")
-        AWSNetworking(
+        networking_ok = AWSNetworking(
             app_name=params['app_name'],
             region=params['region'],
             profile=params['profile']
@@ -154,6 +172,9 @@ class AWSApp(quickhost.AppBase, AWSResourceBase):
             profile=params['profile']
         ).destroy()
 
+        if not networking_ok:
+            return CliResponse(None, "Some quickhost networking resources in {} could not be removed, see the log".format(
+                params['region']), QHExit.GENERAL_FAILURE)
         return CliResponse("Finished removing AWS resources from account '{}' in {}".format(
             account, params['region']), None, QHExit.OK)
 
@@ -167,6 +188,9 @@ class AWSApp(quickhost.AppBase, AWSResourceBase):
         must be run as an admin-like user
         """
         logger.debug('run init')
+        import yaml
+        from .AWSIam import Iam
+        from .AWSNetworking import AWSNetworking
         logger.debug("init args {}".format(init_args))
         finished_with_errors = False
         params = {
@@ -174,8 +198,7 @@ class AWSApp(quickhost.AppBase, AWSResourceBase):
             "profile": init_args['profile'],
         }
         session = self._get_session(region=params['region'], profile=params['profile'])
-        sts = session.client('sts')
-        whoami = sts.get_caller_identity()
+        whoami = self._get_caller_identity(region=params['region'], profile=params['profile'])
         whoami['username'] = self._get_user_name_from_arn(whoami['Arn'])
         whoami['region'] = session.region_name
         whoami['profile'] = session.profile_name
@@ -200,13 +223,19 @@ class AWSApp(quickhost.AppBase, AWSResourceBase):
             region=init_args['region'],
         )
         try:
-            created_networking_resources = networking_params.create()
+            created_networking_resources = networking_params.create(multi_az=init_args.get('multi_az', False))
             for k, v in created_networking_resources.items():
                 logger.info(f"{k} = {v}")
         except Exception as e:
             finished_with_errors = True
             logger.error(e, exc_info=True)
 
+        if init_args.get('prefetch_images'):
+            from .AWSImage import AMIResolver
+            logger.info("prefetching images...")
+            images = AMIResolver.prefetch(profile=init_args['profile'])
+            logger.info(f"cached {len(images)} images")
+
         print(yaml.dump({
             "quickhost": {
                 **created_iam_resources,
@@ -221,6 +250,10 @@ class AWSApp(quickhost.AppBase, AWSResourceBase):
     # @@@ CliResponse
     def describe(self, args: dict) -> CliResponse:
         logger.debug('describe')
+        from .AWSIam import Iam
+        from .AWSSG import SG
+        from .AWSHost import AWSHost
+        from .AWSKeypair import KP
         logger.debug("describe args {}".format(args))
         params = args
         params['profile'] = AWSConstants.DEFAULT_IAM_USER
@@ -250,17 +283,12 @@ class AWSApp(quickhost.AppBase, AWSResourceBase):
             region=params['region'],
             profile=params['profile'],
         )
-        passwords = {}
-        for h in hosts_describe:
-            if h['platform'] in ['Windows',]:
+        for h in hosts_describe or []:
+            if h.platform in ['Windows',]:
                 if params['show_password']:
-                    passwords[h['instance_id']] = kp.windows_get_password(h['instance_id'])
+                    h.password = kp.windows_get_password(h.instance_id)
                 else:
-                    passwords[h['instance_id']] = '*****************************'
-        for h in hosts_describe:
-            for inst_id, pw in passwords.items():
-                if inst_id == h['instance_id']:
-                    h['password'] = pw
+                    h.password = '*****************************'
 
         kp_describe = kp.describe()
         caller_info = {
@@ -277,49 +305,138 @@ class AWSApp(quickhost.AppBase, AWSResourceBase):
             logger.warning("No hosts found for app " + self.app_name)
         else:
             for i, host in enumerate(hosts_describe):
-                self._print_loaded_args(host, heading=f"host {i}")
+                self._print_loaded_args(host.as_dict(), heading=f"host {i}")
+        not_ready = []
+        if params.get('wait_ready') and hosts_describe:
+            readiness = self._wait_ready(
+                hosts,
+                hosts_describe,
+                cloud_init=params.get('wait_cloud_init', False),
+                timeout=params.get('ready_timeout') or AWSConstants.PROBE_TIMEOUT,
+            )
+            self._print_loaded_args({i: r.ready_at for i, r in readiness.items()}, heading="ready at")
+            not_ready = [i for i, r in readiness.items() if not r.ready]
+        if params.get('watch'):
+            from .watch import Watcher, diff_hosts
+            print(f"watching '{self.app_name}' for changes (Ctrl-C to stop)")
+            Watcher(hosts.live_hosts, diff_hosts).run(initial=hosts.live_hosts())
+            self._log_api_calls()
+        if not_ready:
+            return CliResponse(None, "not ready: {}".format(", ".join(not_ready)), QHExit.GENERAL_FAILURE)
         if kp_describe and hosts_describe and sg_describe:
             return CliResponse('Done', None, QHExit.OK)
         else:
             return CliResponse(None, "Check logs for errors", 1)
 
-    # @@@ need to get regions...
     @classmethod
-    def list_all(self):
-        return CliResponse(json.dumps({
-            "apps": AWSHost(
-                app_name="list-all",
-                profile=AWSConstants.DEFAULT_IAM_USER,  # @@@
-                region=AWSConstants.DEFAULT_REGION,  # @@@
-            ).get_all_running_apps(region=AWSConstants.DEFAULT_REGION)  # @@@
-            # ...
-        }, indent=3), None, QHExit.OK)
+    def _for_each_region(self, regions, fn):
+        """
+        Call fn(region) for every region on a bounded thread pool.
+        Returns ({region: result}, {region: error}).
+        """
+        rtn = {}
+        errors = {}
+        with ThreadPoolExecutor(max_workers=AWSConstants.MAX_REGION_WORKERS) as pool:
+            futures = {pool.submit(fn, region): region for region in regions}
+            for future in as_completed(futures):
+                region = futures[future]
+                try:
+                    rtn[region] = future.result()
+                except Exception as e:
+                    logger.error(f"({region}) {e}")
+                    errors[region] = e
+        return rtn, errors
 
     @classmethod
-    def destroy_all(self):
-        apps = AWSHost(
-            app_name="destroy-all",
-            profile=AWSConstants.DEFAULT_IAM_USER,
-            region=AWSConstants.DEFAULT_REGION,  # @@@
-        ).get_all_running_apps(region=AWSConstants.DEFAULT_REGION)  # @@@
-        if apps is None:
+    def list_all(self, args: dict = None):
+        """
+        List the apps in every region. quickhost calls this without arguments;
+        `args` ('region': [regions], 'profile') is for callers within the plugin.
+        """
+        from .AWSHost import AWSHost
+        args = args or {}
+        regions = args.get('region', AWSConstants.AVAILABLE_REGIONS)
+        profile = args.get('profile', AWSConstants.DEFAULT_IAM_USER)
+        apps, errors = self._for_each_region(regions, lambda region: AWSHost.get_all_running_apps(region=region, profile=profile))
+        stdout = json.dumps({
+            "apps": {region: apps[region] for region in regions if apps.get(region)},
+        }, indent=3)
+        if errors:
+            return CliResponse(stdout, "failed to list apps in: {}".format(", ".join(errors)), QHExit.GENERAL_FAILURE)
+        return CliResponse(stdout, None, QHExit.OK)
+
+    @classmethod
+    def destroy_all(self, args: dict = None):
+        """
+        Destroy every app in the given regions in bulk: all hosts of a region are
+        terminated and waited on together (see AWSHost.destroy_all), then the
+        apps' security groups and key pairs are deleted in parallel.
+        quickhost calls this without arguments, which covers the default region;
+        `args` ('region': [regions], 'profile') is for callers within the plugin.
+        """
+        args = args or {}
+        regions = args.get('region', [AWSConstants.DEFAULT_REGION])
+        if isinstance(regions, str):
+            regions = [regions]
+        profile = args.get('profile', AWSConstants.DEFAULT_IAM_USER)
+        results, errors = self._for_each_region(regions, lambda region: self._destroy_region(region, profile))
+        destroyed = sum(len(apps) for apps, _ in results.values())
+        failed = [f"{app_name} ({region})" for region, (_, region_failed) in results.items() for app_name in region_failed]
+        if destroyed == 0 and not failed and not errors:
             return CliResponse("Nothing to destroy.", None, QHExit.OK)
-        logger.info("Destroying {} apps".format(len(apps)))
-        for a in apps:
-            app = AWSApp(a.split(" ")[0])
-            app.destroy(args={
-                "h": False,
-                "profile": AWSConstants.DEFAULT_IAM_USER,
-                "region": AWSConstants.DEFAULT_REGION,  # @@@ need to get region from AWSApp.list_all
-                "yes": True
-            })
-            logger.info("Destroyed app '{}'".format(app.app_name))
-
-        return CliResponse("Destroyed {} apps".format(len(apps)), None, QHExit.OK)
+        if failed or errors:
+            return CliResponse(
+                "Destroyed {} apps".format(destroyed),
+                "failed to destroy: {}".format(", ".join(failed + [f"(apps in {region})" for region in errors])),
+                QHExit.GENERAL_FAILURE
+            )
+        return CliResponse("Destroyed {} apps".format(destroyed), None, QHExit.OK)
+
+    @classmethod
+    def _destroy_region(self, region, profile):
+        """Returns ([destroyed app names], [failed app names]) for `region`"""
+        from .AWSSG import SG
+        from .AWSHost import AWSHost
+        from .AWSKeypair import KP
+        from .AWSLaunchTemplate import LaunchTemplate
+        hosts_by_app, hosts_ok = AWSHost.destroy_all(region=region, profile=profile)
+        logger.info("({}) destroying {} apps".format(region, len(hosts_by_app)))
+
+        def _destroy(app_name, hosts):
+            if not all(h.state == 'terminated' for h in hosts):
+                # the security group can't be deleted while instances still use it
+                logger.error(f"({region}) hosts of app '{app_name}' did not terminate, keeping its security group and key")
+                return False
+            kp_destroyed = KP(app_name=app_name, region=region, profile=profile).destroy()
+            LaunchTemplate(app_name=app_name, region=region, profile=profile).destroy()
+            sg_destroyed = SG(app_name=app_name, region=region, profile=profile, vpc_id=hosts[0].vpc_id).destroy()
+            logger.info("Destroyed app '{}' ({})".format(app_name, region))
+            return kp_destroyed and sg_destroyed
+
+        destroyed = []
+        failed = []
+        with ThreadPoolExecutor(max_workers=AWSConstants.MAX_APP_WORKERS) as pool:
+            futures = {pool.submit(_destroy, app_name, hosts): app_name for app_name, hosts in hosts_by_app.items()}
+            for future in as_completed(futures):
+                app_name = futures[future]
+                try:
+                    if future.result():
+                        destroyed.append(app_name)
+                    else:
+                        failed.append(app_name)
+                except Exception as e:
+                    logger.error(f"Failed to destroy app '{app_name}' ({region}): {e}")
+                    failed.append(app_name)
+        if not hosts_ok:
+            logger.warning(f"({region}) not all hosts terminated")
+        return destroyed, failed
 
     # @@@ CliResponse
     def create(self, args: dict) -> CliResponse:
         logger.debug('make')
+        from .AWSSG import SG
+        from .AWSHost import AWSHost
+        from .AWSKeypair import KP
         logger.debug("make args {}".format(args))
         stdout = ""
         stderr = ""
@@ -343,58 +460,171 @@ class AWSApp(quickhost.AppBase, AWSResourceBase):
             logger.error(f"app named '{self.app_name}' already exists")
             return CliResponse(None, f"app named '{self.app_name}' already exists", QHExit.ABORTED)
 
-        kp_created = kp.create()
-        sg_created = sg.create(
-            ports=params['ports'],
-            cidrs=params['cidrs'],
-        )
-        hosts_created = host.create(
-            subnet_id=self.subnet_id,
-            num_hosts=params['host_count'],
-            _os=params['os'],
-            instance_type=params['instance_type'],
-            sgid=sg.sgid,
-            key_name=params['key_name'],
-            disk_size=params['disk_size'],
-            userdata=params['userdata'],
-        )
+        # set when hosts of a failed make could not be terminated, so their key
+        # and security group are kept instead of rolled back
+        hosts_left = []
+
+        def _create_hosts(kp_created, sg_created, image):
+            try:
+                hosts_created = host.create(
+                    subnet_id=self.subnet_id,
+                    num_hosts=params['host_count'],
+                    _os=params['os'],
+                    instance_type=params['instance_type'],
+                    sgid=sg.sgid,
+                    key_name=params['key_name'],
+                    disk_size=params['disk_size'],
+                    userdata=params['userdata'],
+                    image=image,
+                    ports=params['ports'],
+                    wait_ready=params['wait_ready'],
+                    cloud_init=params['cloud_init'],
+                    ready_timeout=params['ready_timeout'],
+                    warm_pool=params['use_warm_pool'],
+                    subnet_ids=self.subnet_ids if params['spread'] else None,
+                )
+                if hosts_created is None:
+                    raise Exception(f"no hosts were created for '{self.app_name}'")
+                return hosts_created
+            except Exception:
+                # a failed task isn't rolled back itself, only the ones before it are
+                if not host.terminate_launched():
+                    hosts_left.append(True)
+                raise
+
+        # KP.create() returns None if the key already existed, SG.create() returns
+        # False if the group already existed; only roll back what was made here
+        graph = TaskGraph()
+        graph.add('kp', kp.create, rollback=lambda created: created is not None and not hosts_left and kp.destroy())
+        graph.add('sg', lambda: sg.create(ports=params['ports'], cidrs=params['cidrs']), rollback=lambda created: created and not hosts_left and sg.destroy())
+        graph.add('image', lambda: host.get_latest_image(params['os']))
+        graph.add('hosts', _create_hosts, deps=['kp', 'sg', 'image'])
+        try:
+            results = graph.run()
+        except TaskGraphError as e:
+            self._log_api_calls()
+            if hosts_left:
+                logger.error(f"some hosts of '{self.app_name}' are still running, kept their key and security group; run destroy to remove them")
+            return CliResponse(None, f"failed to create app '{self.app_name}': {e}", QHExit.GENERAL_FAILURE)
+        self._log_api_calls()
+        kp_created, sg_created, hosts_created = results['kp'], results['sg'], results['hosts']
         if kp_created and hosts_created is not None and sg_created:
             return CliResponse('Done', None, QHExit.OK)
         else:
             return CliResponse('finished creating hosts with warnings', f"{kp_created=}, {hosts_created=}, {sg_created=}", QHExit.GENERAL_FAILURE)
 
+    def _wait_ready(self, host, hosts, cloud_init=False, timeout=AWSConstants.PROBE_TIMEOUT) -> dict:
+        """
+        Block until `hosts` accept connections, see AWSHost.wait_until_ready().
+        Probes 3389 on Windows hosts and 22 on everything else.
+        """
+        by_ports = {}
+        for h in hosts:
+            ports = (3389,) if h.platform == 'Windows' else (22,)
+            by_ports.setdefault(ports, []).append(h)
+        readiness = {}
+        for ports, group in by_ports.items():
+            readiness.update(host.wait_until_ready(group, list(ports), cloud_init=cloud_init, timeout=timeout))
+        return readiness
+
     def update(self, args: dict) -> CliResponse:
-        raise Exception("TODO")
+        """
+        Change which ports an app's hosts are open on, and to which cidrs,
+        without re-making it. Only the security group rules that differ are
+        authorized or revoked, see AWSSG.SG.update().
+        """
+        from .AWSSG import SG
         logger.debug("update args {}".format(args))
+        if args.get('ami') or args.get('userdata'):
+            logger.warning("only ports and ips of an existing app can be updated, ignoring --ami and --userdata")
+        self.load_default_config(region=args['region'], profile=args['profile'])
+        ports = None
+        if args.get('port'):
+            ports = list(dict.fromkeys(args['port']))
+        my_ip = quickhost.get_my_public_ip()
+        cidrs = None
+        if args.get('ip'):
+            # like make, always keep the caller's own ip
+            cidrs = [my_ip]
+            for i in args['ip']:
+                if len(i.split('/')) == 1:
+                    logger.warning(f"Assuming /32 cidr for ip '{i}'")
+                    cidrs.append(i + "/32")
+                else:
+                    cidrs.append(i)
+        sg = SG(
+            app_name=self.app_name,
+            region=args['region'],
+            profile=args['profile'],
+            vpc_id=self.vpc_id,
+        )
+        # a group with no rules left gets make's defaults for whichever side wasn't given
+        changes = sg.update(ports=ports, cidrs=cidrs, default_cidrs=[my_ip], dry_run=args.get('dry_run', False))
+        if changes is None:
+            return CliResponse(None, f"No security group found for app '{self.app_name}'", QHExit.GENERAL_FAILURE)
+        if changes is False:
+            return CliResponse(None, f"could not update the security group of '{self.app_name}', see the log", QHExit.GENERAL_FAILURE)
+        lines = [f"+ {port}/tcp {cidr}" for port, cidr in changes['authorized']]
+        lines += [f"- {port}/tcp {cidr}" for port, cidr in changes['revoked']]
+        if not lines:
+            return CliResponse(f"app '{self.app_name}' is already up to date", None, QHExit.OK)
+        if args.get('dry_run'):
+            lines.insert(0, "dry run, would apply:")
+        return CliResponse('\n'.join(lines), None, QHExit.OK)
 
     def destroy(self, args: dict) -> CliResponse:
         logger.debug("destroy")
+        from .AWSSG import SG
+        from .AWSHost import AWSHost
+        from .AWSKeypair import KP
+        from .AWSLaunchTemplate import LaunchTemplate
         logger.debug("destroy args {}".format(args))
         if 'yes' not in args.keys():
             prompt_continue = input("proceed? (y/n)")
             if not prompt_continue == 'y':
                 print("aborted.")
                 rc = QHExit.ABORTED
-                return CliResponse(rc, "", "")
-        self.load_default_config()
+                return CliResponse(None, "aborted", rc)
+        self.load_default_config(region=args['region'], profile=args['profile'])
         print(args)
-        kp_destroyed = KP(
+        kp = KP(
             app_name=self.app_name,
             region=args['region'],
             profile=args['profile']
-        ).destroy()
+        )
         hosts = AWSHost(
             region=args['region'],
             app_name=self.app_name,
             profile=args['profile']
         )
-        hosts_destroyed = hosts.destroy()
-        sg_destroyed = SG(
+        sg = SG(
             app_name=self.app_name,
             region=args['region'],
             profile=args['profile'],
             vpc_id=self.vpc_id,
-        ).destroy()
+        )
+
+        def _destroy_hosts():
+            hosts_destroyed = hosts.destroy()
+            if hosts_destroyed is False:
+                # the security group can't be deleted while instances still use it
+                raise Exception(f"hosts for '{self.app_name}' did not terminate")
+            return hosts_destroyed
+
+        graph = TaskGraph()
+        graph.add('kp', kp.destroy)
+        graph.add('launch_template', LaunchTemplate(app_name=self.app_name, region=args['region'], profile=args['profile']).destroy)
+        graph.add('hosts', _destroy_hosts)
+        graph.add('sg', lambda _: sg.destroy(), deps=['hosts'])
+        try:
+            results = graph.run()
+        except TaskGraphError as e:
+            self._log_api_calls()
+            return CliResponse('finished destroying hosts with errors', f"failed to destroy app '{self.app_name}': {e}", QHExit.GENERAL_FAILURE)
+        self._log_api_calls()
+        kp_destroyed, hosts_destroyed, sg_destroyed = results['kp'], results['hosts'], results['sg']
+        if not results['launch_template']:
+            logger.warning(f"could not delete the launch template of '{self.app_name}'")
         if kp_destroyed and hosts_destroyed and sg_destroyed:
             return CliResponse('Done', '', QHExit.OK)
         else:
@@ -472,5 +702,14 @@ class AWSApp(quickhost.AppBase, AWSResourceBase):
             make_params['disk_size'] = int(input_args['disk_size'])
         else:
             make_params['disk_size']  = None
+        # readiness probing, see AWSHost.wait_until_ready()
+        make_params['wait_ready'] = input_args['wait_ready'] if 'wait_ready' in flags else False
+        make_params['cloud_init'] = input_args['wait_cloud_init'] if 'wait_cloud_init' in flags else False
+        if 'ready_timeout' in flags:
+            make_params['ready_timeout'] = int(input_args['ready_timeout'])
+        else:
+            make_params['ready_timeout'] = AWSConstants.PROBE_TIMEOUT
+        make_params['use_warm_pool'] = input_args['use_warm_pool'] if 'use_warm_pool' in flags else False
+        make_params['spread'] = input_args['spread'] if 'spread' in flags else True
 
         return make_params
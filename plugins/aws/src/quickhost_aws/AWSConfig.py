@@ -13,30 +13,87 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from dataclasses import dataclass
-from typing import NewType, List
-
 """
-These are utility functions, types, etc.
-This module should only import from the standard library.
+Plain data types shared across the plugin: the HostRecord every instance
+lookup produces, and the client settings applied by the scheduler.
+This module only imports from the standard library and .constants, so it
+is cheap to import and can't create import cycles.
 """
 
-Region = NewType('Region', str)
-Port = NewType('Port', int)
-Cidr = NewType('Cidr', str)
+import os
+from dataclasses import dataclass, field
 
+from .constants import AWSConstants
 
-@dataclass
-class AWSHostConfig:
+
+@dataclass(slots=True)
+class HostRecord:
+    """
+    One EC2 instance, as much of it as quickhost cares about.
+    Build these with from_instance() directly from describe_instances or
+    run_instances output.
+    """
     app_name: str
-    region: Region
-    host_count: int
+    instance_id: str
+    state: str
+    ami: str = None
+    security_group: str = None
+    instance_type: str = None
+    public_ip: str = None
+    subnet_id: str = None
+    vpc_id: str = None
+    platform: str = None
+    password: str = None
+
+    @classmethod
+    def from_instance(cls, instance: dict, app_name: str = None) -> 'HostRecord':
+        """
+        `instance` is one item of describe_instances' Reservations[].Instances[]
+        (or of run_instances' Instances[]). The app name comes from the
+        instance's quickhost tag (or its Name tag) unless `app_name` is given.
+        """
+        if app_name is None:
+            tags = {t['Key']: t['Value'] for t in instance.get('Tags', ())}
+            app_name = tags.get('quickhost', tags.get('Name'))
+        sgs = instance.get('SecurityGroups')
+        return cls(
+            app_name=app_name,
+            instance_id=instance['InstanceId'],
+            state=instance['State']['Name'],
+            ami=instance.get('ImageId'),
+            security_group=sgs[0]['GroupId'] if sgs else None,
+            instance_type=instance.get('InstanceType'),
+            public_ip=instance.get('PublicIpAddress'),
+            subnet_id=instance.get('SubnetId'),
+            vpc_id=instance.get('VpcId'),
+            platform=instance.get('PlatformDetails'),
+        )
+
+    def as_dict(self) -> dict:
+        return {f: getattr(self, f) for f in self.__slots__ if not (f == 'password' and self.password is None)}
+
+
+def _env(name, default, _type=str):
+    value = os.environ.get(f"QUICKHOST_AWS_{name}")
+    if value is None:
+        return default
+    return _type(value)
 
 
 @dataclass
-class AWSSgConfig:
-    app_name: str
-    region: Region
-    vpc_id: str
-    ports: List[Port]
-    cidrs: List[Cidr]
+class AWSClientConfig:
+    """
+    Settings applied to every boto3 client the plugin creates.
+    Each field can be overridden with a QUICKHOST_AWS_<FIELD> environment
+    variable, e.g. QUICKHOST_AWS_MAX_ATTEMPTS=5.
+    """
+    retry_mode: str = field(default_factory=lambda: _env('RETRY_MODE', AWSConstants.CLIENT_RETRY_MODE))
+    max_attempts: int = field(default_factory=lambda: _env('MAX_ATTEMPTS', AWSConstants.CLIENT_MAX_ATTEMPTS, int))
+    max_pool_connections: int = field(default_factory=lambda: _env('MAX_POOL_CONNECTIONS', AWSConstants.CLIENT_MAX_POOL_CONNECTIONS, int))
+    connect_timeout: float = field(default_factory=lambda: _env('CONNECT_TIMEOUT', AWSConstants.CLIENT_CONNECT_TIMEOUT, float))
+    read_timeout: float = field(default_factory=lambda: _env('READ_TIMEOUT', AWSConstants.CLIENT_READ_TIMEOUT, float))
+    # 0 disables client-side rate limiting
+    requests_per_second: float = field(default_factory=lambda: _env('REQUESTS_PER_SECOND', AWSConstants.CLIENT_REQUESTS_PER_SECOND, float))
+    request_burst: int = field(default_factory=lambda: _env('REQUEST_BURST', AWSConstants.CLIENT_REQUEST_BURST, int))
+    # when set, every api response is written here, see capture.py
+    capture_dir: str = field(default_factory=lambda: _env('CAPTURE_DIR', None))
@@ -13,22 +13,24 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import List, Any
-import time
+from typing import List, Any, Dict
 import logging
-from datetime import datetime
+import time
 from collections import defaultdict
 from dataclasses import dataclass
 
 from botocore.exceptions import ClientError
-import boto3
 
-import quickhost
 from quickhost import APP_CONST as QHC
-from quickhost.temp_data_collector import store_test_data
 
 from .constants import AWSConstants
 from .AWSResource import AWSResourceBase
+from .AWSConfig import HostRecord
+from .AWSImage import AMIResolver
+from .waiter import HostWaiter
+from .fleet import FleetLauncher
+from .AWSLaunchTemplate import LaunchTemplate, TEMPLATE_NOT_FOUND_ERRORS
+from .probe import ReadinessProbe
 
 logger = logging.getLogger(__name__)
 
@@ -38,26 +40,46 @@ class AWSHost(AWSResourceBase):
     Class for AWS host operations.
     """
     def __init__(self, app_name, profile, region):
-        session = self._get_session(profile=profile, region=region)
         self.region = region
-        self.client = session.client('ec2')
-        self.ec2 = session.resource('ec2')
+        self.profile = profile
+        self.client = self._get_client('ec2', profile=profile, region=region)
+        self.ec2 = self._get_resource('ec2', profile=profile, region=region)
         self.app_name = app_name
         self.host_count = None
+        self._snapshot = None
+
+    @property
+    def snapshot(self) -> 'InstanceSnapshot':
+        """The app's instances for the current operation, fetched on first use"""
+        if self._snapshot is None:
+            self._snapshot = InstanceSnapshot(self.client, self.app_name).refresh()
+        return self._snapshot
 
-    def create(self, num_hosts, instance_type, sgid, subnet_id, userdata, key_name, _os, disk_size=None, dry_run=False):
+    def create(self, num_hosts, instance_type, sgid, subnet_id, userdata, key_name, _os, disk_size=None, dry_run=False, image=None,
+               ports=None, wait_ready=False, cloud_init=False, ready_timeout=AWSConstants.PROBE_TIMEOUT, warm_pool=False,
+               subnet_ids=None):
+        """
+        `image` is the result of get_latest_image(_os), looked up here if not given.
+        With `wait_ready`, blocks until `ports` accept connections on every host
+        (and cloud-init finished, with `cloud_init`), see wait_until_ready().
+        With `warm_pool`, hosts are taken from the (region, os, instance type)
+        warm pool first, see AWSWarmPool.WarmPool.
+        With more than one of `subnet_ids`, new hosts are spread across them,
+        see fleet.FleetLauncher.
+        """
         rtn = {
             "region": self.region,
             "num_hosts": num_hosts,
             "instance_type": instance_type,
             "sgid": sgid,
             "subnet_id": subnet_id,
+            "subnet_ids": subnet_ids or [subnet_id],
             "userdata": userdata,
             "key_name": key_name,
             "os": _os,
         }
 
-        latest_image = self.get_latest_image(_os)
+        latest_image = image or self.get_latest_image(_os)
         image_id = latest_image['image_id']
         rtn['image_id'] = image_id
 
@@ -66,41 +88,9 @@ class AWSHost(AWSResourceBase):
         if self.get_host_count() > 0:
             logger.error(f"Hosts for app '{self.app_name}' already exist")
             return None
-        run_instances_params = {
-            'ImageId': image_id,
-            'InstanceType': instance_type,
-            'KeyName': key_name,
-            'Monitoring': { 'Enabled': False },
-            'MaxCount': int(num_hosts),
-            'MinCount': 1,
-            'DisableApiTermination': False,
-            'DryRun': dry_run,
-            'InstanceInitiatedShutdownBehavior': 'terminate',
-            'NetworkInterfaces': [
-                {
-                    'AssociatePublicIpAddress': True,
-                    'DeviceIndex': 0,
-                    'SubnetId': subnet_id,
-                    'Groups': [ sgid ],
-                }
-            ],
-            'TagSpecifications': [
-                { 'ResourceType': 'instance', 'Tags': [
-                    { 'Key': QHC.DEFAULT_APP_NAME, 'Value': self.app_name },
-                    { 'Key': "Name", 'Value': self.app_name },
-                ]},
-                { 'ResourceType': 'volume', 'Tags': [
-                    { 'Key': QHC.DEFAULT_APP_NAME, 'Value': self.app_name },
-                ]},
-            ],
-        }
-
-        if userdata:
-            run_instances_params['UserData'] = self.get_userdata(userdata)
-
         if disk_size is not None:
             if disk_size < latest_image['ami_disk_size']:
-                logger.warning("Requested dist size of {} GiB is smaller than the ami disk size ({}), using ami disk size instead.".format(disk_size, latest_image['disk_size']))
+                logger.warning("Requested dist size of {} GiB is smaller than the ami disk size ({}), using ami disk size instead.".format(disk_size, latest_image['ami_disk_size']))
                 tgt_disk_size = latest_image['ami_disk_size']
             else:
                 tgt_disk_size = disk_size
@@ -108,54 +98,119 @@ class AWSHost(AWSResourceBase):
             tgt_disk_size = latest_image['ami_disk_size']
         rtn['disk_size'] = tgt_disk_size
 
-        response = self.client.run_instances(
-            **run_instances_params,
-            BlockDeviceMappings=[
-                {
-                    'DeviceName': latest_image['device_name'],
-                    'Ebs': { 'VolumeSize': tgt_disk_size, },
-                }
-            ])
+        pool = None
+        pooled_ids = []
+        if warm_pool:
+            if userdata or disk_size is not None or dry_run:
+                logger.warning("Not using the warm pool, its hosts can't take userdata or a disk size")
+            else:
+                from .AWSWarmPool import WarmPool
+                pool = WarmPool(profile=self.profile, region=self.region, os=_os, instance_type=instance_type, subnet_id=subnet_id)
+                pooled_ids = pool.claim(self.app_name, int(num_hosts), sgid)
+        rtn['num_from_warm_pool'] = len(pooled_ids)
 
-        r_cleaned = quickhost.scrub_datetime(response)
-        store_test_data(resource='AWSHost', action='create', response_data=r_cleaned)
-        self.wait_for_hosts_to_start(num_hosts)
+        instances = []
+        if int(num_hosts) > len(pooled_ids):
+            template = LaunchTemplate(app_name=self.app_name, profile=self.profile, region=self.region)
+            template_data = template.template_data(
+                image=latest_image,
+                instance_type=instance_type,
+                key_name=key_name,
+                sgid=sgid,
+                subnet_id=subnet_id,
+                app_name=self.app_name,
+                disk_size=tgt_disk_size,
+                userdata=self.get_userdata(userdata) if userdata else None,
+            )
+            count = int(num_hosts) - len(pooled_ids)
+            spread = {}
+            if subnet_ids and len(subnet_ids) > 1:
+                spread = {
+                    'subnet_ids': subnet_ids,
+                    'network_interface': {'AssociatePublicIpAddress': True, 'DeviceIndex': 0, 'Groups': [ sgid ]},
+                }
+            try:
+                instances = self._launch_from_template(template, template_data, count, dry_run=dry_run, **spread)
+            except ClientError as e:
+                if e.response['Error']['Code'] not in TEMPLATE_NOT_FOUND_ERRORS:
+                    raise e
+                # the cached template version was deleted outside of quickhost
+                logger.debug(f"launch template gone ({e.response['Error']['Code']}), recreating it")
+                template.invalidate()
+                instances = self._launch_from_template(template, template_data, count, dry_run=dry_run, use_cache=False, **spread)
+        launched_ids = self.snapshot.add(instances)
+        if pooled_ids:
+            self.snapshot.refresh(instance_ids=pooled_ids)
+            launched_ids += pooled_ids
+        if pool is not None:
+            pool.fill_async(AWSConstants.WARM_POOL_SIZE)
+        rtn['num_launched'] = len(launched_ids)
+        if not launched_ids:
+            logger.error(f"No hosts could be launched for app '{self.app_name}'")
+            return None
+        self.wait_for_hosts_to_start(launched_ids)
+        # public ips are assigned after launch
+        self.snapshot.refresh(instance_ids=launched_ids)
         ssh_strings = []
         app_insts_thingy = self._get_app_instances()
-        for i in app_insts_thingy:
-            inst = self._parse_host_output(i)
+        for inst in app_insts_thingy:
             logger.debug(f"match {_os}")
+            # warm pool hosts were launched with the pool's key
+            inst_key_name = AWSConstants.WARM_POOL_KEY_NAME if inst.instance_id in pooled_ids else key_name
             match _os:
                 case "ubuntu":
-                    ssh_strings.append(f"ssh -i {key_name}.pem ubuntu@{inst['public_ip']}")
+                    ssh_strings.append(f"ssh -i {inst_key_name}.pem ubuntu@{inst.public_ip}")
                 case "amazon-linux-2":
-                    ssh_strings.append(f"ssh -i {key_name}.pem ec2-user@{inst['public_ip']}")
+                    ssh_strings.append(f"ssh -i {inst_key_name}.pem ec2-user@{inst.public_ip}")
                 case "windows":
-                    ssh_strings.append(f"*{inst['public_ip']}")
+                    ssh_strings.append(f"*{inst.public_ip}")
                 case "windows-core":
-                    ssh_strings.append(f"*{inst['public_ip']}")
+                    ssh_strings.append(f"*{inst.public_ip}")
                 case _:
                     logger.warning(f"invalid os '{_os}'")
         [ print(f"host {i}) {ssh}") for i, ssh in enumerate(ssh_strings) ]
+        if wait_ready and ports and app_insts_thingy:
+            readiness = self.wait_until_ready(app_insts_thingy, ports, cloud_init=cloud_init, timeout=ready_timeout)
+            rtn['ready'] = {i: r.ready_at for i, r in readiness.items()}
         return rtn
 
-    def describe(self) -> List[Any] | None:
+    def wait_until_ready(self, hosts: List[HostRecord], ports: List[int], cloud_init=False, timeout=AWSConstants.PROBE_TIMEOUT):
+        """
+        Probe `ports` on all `hosts` at once, see probe.ReadinessProbe.
+        Returns {instance_id: probe.HostReadiness}
+        """
+        ports = [int(p) for p in ports]
+        print(f"===================Waiting for {len(hosts)} hosts of '{self.app_name}' to accept connections on {ports}=========================")
+        t_start = time.time()
+        readiness = ReadinessProbe(
+            hosts,
+            {h.instance_id: ports for h in hosts},
+            client=self.client,
+            cloud_init=cloud_init,
+            timeout=timeout,
+        ).run()
+        for instance_id, r in readiness.items():
+            if r.ready:
+                print(f"{instance_id} ({r.public_ip}) ready after {r.ready_at - t_start:.1f}s")
+            else:
+                print(f"{instance_id} ({r.public_ip}) not ready after {timeout}s")
+        return readiness
+
+    def _launch_from_template(self, template: LaunchTemplate, template_data: dict, count: int, dry_run=False, use_cache=True,
+                              subnet_ids=None, network_interface=None) -> List[dict]:
+        spec = template.ensure(template_data, use_cache=use_cache, dry_run=dry_run)
+        return FleetLauncher(
+            self.client,
+            {'LaunchTemplate': spec, 'DryRun': dry_run},
+            count,
+            subnet_ids=subnet_ids,
+            network_interface=network_interface,
+        ).launch()
+
+    def describe(self) -> List[HostRecord] | None:
         logger.debug("AWSHost.describe")
-        instances = []
         try:
-            app_hosts = self.client.describe_instances(
-                Filters=[
-                    { 'Name': f"tag:{QHC.DEFAULT_APP_NAME}", 'Values': [ self.app_name,] },
-                    { 'Name': 'instance-state-name', 'Values': ['running', 'pending'] },
-                ],
-                DryRun=False,
-                MaxResults=10,
-            )
-            store_test_data(resource='AWSHost', action='describe_instances', response_data=quickhost.scrub_datetime(app_hosts))
-            for r in app_hosts['Reservations']:
-                for host in r['Instances']:
-                    if host['State']['Name'] in ['running', 'pending']:
-                        instances.append(self._parse_host_output(host=host))
+            instances = self.snapshot.instances('running', 'pending')
         except ClientError as e:
             logger.error(f"(Security Group) Unhandled botocore client exception: ({e.response['Error']['Code']}): {e.response['Error']['Message']}")
             raise e
@@ -164,6 +219,27 @@ class AWSHost(AWSResourceBase):
         else:
             return instances
 
+    def live_hosts(self) -> Dict[str, HostRecord]:
+        """Describe the app again; returns {instance_id: HostRecord} for every host that isn't terminated"""
+        return {h.instance_id: h for h in InstanceSnapshot(self.client, self.app_name).refresh().instances(*LIVE_STATES)}
+
+    def terminate_launched(self) -> bool:
+        """
+        Terminate every host of the app that isn't terminated yet, both the
+        ones create() recorded and the ones the app's tag finds, and wait for
+        them. Undoes a create() that failed part way; True if none are left.
+        """
+        try:
+            ids = sorted(set(self.snapshot.ids(*LIVE_STATES)) | set(self.live_hosts()))
+            if not ids:
+                return True
+            logger.warning(f"terminating {len(ids)} hosts launched for '{self.app_name}'")
+            self.snapshot.set_states(terminate_instances(self.client, ids))
+        except ClientError as e:
+            logger.error(e)
+            return False
+        return self.wait_for_hosts_to_terminate(tgt_instances=ids)
+
     def destroy(self) -> bool:
         logger.debug("destroying instnaces: ")
         tgt_instances = self.get_instance_ids('running')
@@ -171,40 +247,57 @@ class AWSHost(AWSResourceBase):
             logger.debug(f"No instances found for app '{self.app_name}'")
             return None
         try:
-            response = self.client.terminate_instances(
-                InstanceIds=tgt_instances
-            )
-            store_test_data(resource='AWSHost', action='terminate_instances', response_data=quickhost.scrub_datetime(response))
+            self.snapshot.set_states(terminate_instances(self.client, tgt_instances))
         except ClientError as e:
             logger.error(e)
             return False
         return self.wait_for_hosts_to_terminate(tgt_instances=tgt_instances)
 
     @classmethod
-    def get_all_running_apps(self, region) -> List[Any] | None:
-        session = boto3.session.Session(profile_name=AWSConstants.DEFAULT_IAM_USER, region_name=region)
-        client = session.client('ec2')
-
-        all_running_hosts = client.describe_instances(
-            Filters=[
-                { 'Name': 'tag-key', 'Values': [QHC.DEFAULT_APP_NAME] },
-                { 'Name': 'instance-state-name', 'Values': ['running'] },
-            ],
-            DryRun=False,
-            MaxResults=101,
-        )
-        app_names = []
-        for r in all_running_hosts['Reservations']:
-            for host in r['Instances']:
-                for t in host['Tags']:
-                    if t['Key'] == 'Name':
-                        app_names.append(t['Value'])
-        if len(app_names) == 0:
+    def destroy_all(self, region, profile=AWSConstants.DEFAULT_IAM_USER, cancel=None) -> tuple[Dict[str, List[HostRecord]], bool]:
+        """
+        Terminate every quickhost instance in `region`: one describe_instances
+        sweep, chunked terminate_instances calls and a single waiter over all of
+        them. Returns ({app_name: [host, ...]}, whether every host terminated).
+        """
+        client = self._get_client('ec2', profile=profile, region=region)
+        hosts_by_app = defaultdict(list)
+        for host in iter_instances(client, filters=[
+                _new_filter('tag-key', QHC.DEFAULT_APP_NAME),
+                _new_filter('instance-state-name', LIVE_STATES),
+        ]):
+            hosts_by_app[host.app_name].append(host)
+        instance_ids = [h.instance_id for hosts in hosts_by_app.values() for h in hosts]
+        if not instance_ids:
+            return {}, True
+        logger.info(f"({region}) terminating {len(instance_ids)} hosts of {len(hosts_by_app)} apps")
+        terminate_instances(client, instance_ids)
+        waiter = HostWaiter(client, instance_ids, 'terminated', cancel=cancel)
+        rtn = waiter.wait()
+        for hosts in hosts_by_app.values():
+            for h in hosts:
+                if waiter.states[h.instance_id] != 'unknown':
+                    h.state = waiter.states[h.instance_id]
+        return dict(hosts_by_app), rtn
+
+    @classmethod
+    def count_running_apps(self, region, profile=AWSConstants.DEFAULT_IAM_USER) -> Dict[str, int]:
+        """Map the name of every app with running hosts in `region` to its host count"""
+        client = self._get_client('ec2', profile=profile, region=region)
+        app_name_count = defaultdict(int)
+        for host in iter_instances(client, filters=[
+                _new_filter('tag-key', QHC.DEFAULT_APP_NAME),
+                _new_filter('instance-state-name', 'running'),
+        ]):
+            app_name_count[host.app_name] += 1
+        return dict(app_name_count)
+
+    @classmethod
+    def get_all_running_apps(self, region, profile=AWSConstants.DEFAULT_IAM_USER) -> List[Any] | None:
+        app_name_count = self.count_running_apps(region, profile=profile)
+        if len(app_name_count) == 0:
             return None
         else:
-            app_name_count = defaultdict(int)
-            for app_name in app_names:
-                app_name_count[app_name] += 1
             _rtn = []
             for k, v in app_name_count.items():
                 if v > 1:
@@ -213,108 +306,31 @@ class AWSHost(AWSResourceBase):
                     _rtn.append(k)
             return _rtn
 
-    def _get_app_instances(self) -> List[Any] | None:
-        """
-        TODO: Create a type to replace List[Any]
-        NOTE: to get 'describe' data, feed the output of this into self._parse_host_output()
-        """
-        app_instances = []
-        all_hosts = self.client.describe_instances(
-            Filters=[
-                { 'Name': f"tag:{QHC.DEFAULT_APP_NAME}", 'Values': [ self.app_name, ] },
-                { 'Name': 'instance-state-name', 'Values': ['running'] },
-            ],
-            DryRun=False,
-            MaxResults=10,
-        )
-        instance_ids = []
-        for r in all_hosts['Reservations']:
-            for host in r['Instances']:
-                app_instances.append(quickhost.scrub_datetime(host))
-                inst = self._parse_host_output(host=host)
-                instance_ids.append(inst['instance_id'])
+    def _get_app_instances(self) -> List[HostRecord] | None:
+        app_instances = self.snapshot.instances('running')
         if len(app_instances) == 0:
             return None
         else:
             return app_instances
 
     def get_instance_ids(self, *states):
-        """Given the app_name, returns the instance id off all instances with a State of 'running'"""
+        """Given the app_name, returns the instance id off all instances with a State in `states`"""
         logger.debug(f"{states=}")
-        app_instances = []
-        all_hosts = self.client.describe_instances(
-            Filters=[
-                { 'Name': f"tag:{QHC.DEFAULT_APP_NAME}", 'Values': [ self.app_name, ] },
-                { 'Name': 'instance-state-name', 'Values': list(states) },
-            ],
-            DryRun=False,
-            MaxResults=10,
-        )
-        store_test_data(resource='AWSHost', action='describe_instances', response_data=quickhost.scrub_datetime(all_hosts))
-        # fishy
-        instance_ids = []
-        for r in all_hosts['Reservations']:
-            for host in r['Instances']:
-                if host['State']['Name'] in states:
-                    app_instances.append(quickhost.scrub_datetime(host))
-                    inst = self._parse_host_output(host=host)
-                    instance_ids.append(inst['instance_id'])
+        instance_ids = self.snapshot.ids(*states)
         if instance_ids == []:
             return None
         return instance_ids
 
-    def get_latest_image(self, os='amazon-linux-2'):
-        """
-        NOTE: (us-east-1, 12/19/2022) Free tier eligible customers can get up to 30 GB of
-        EBS General Purpose (SSD) or Magnetic storage
-        """
-        filterset = [
-            _new_filter('state', 'available'),
-            _new_filter('architecture', 'x86_64'),
-        ]
-        match os:
-            case 'amazon-linux-2':
-                filterset.append(_new_filter('name', 'amzn2-ami-hvm-2.0.*-x86_64-gp2'),)
-            case 'ubuntu':
-                filterset.append(_new_filter('name', '*ubuntu*22.04*'),)
-            case 'windows':
-                filterset.append(_new_filter('name', 'Windows_Server-2022-English-Full-Base*'),)
-            case 'windows-core':
-                filterset.append(_new_filter('name', 'Windows_Server-2022-English-Core-Base*'),)
-            case _:
-                raise Exception(f"no such image type '{os}'")
-        response = self.client.describe_images(
-            Filters=filterset,
-            IncludeDeprecated=False,
-            DryRun=False
-        )
-        sortedimages = sorted(response['Images'], key=lambda x: datetime.strptime(x['CreationDate'], '%Y-%m-%dT%H:%M:%S.%fZ'))
-        return {
-            "image_id": sortedimages[-1]['ImageId'],
-            "ami_disk_size": sortedimages[-1]['BlockDeviceMappings'][0]['Ebs']['VolumeSize'],
-            "device_name": sortedimages[-1]['BlockDeviceMappings'][0]['DeviceName'],
-        }
+    def get_latest_image(self, os='amazon-linux-2', use_cache=True):
+        """see AWSImage.AMIResolver"""
+        return AMIResolver(profile=self.profile, region=self.region).resolve(os, use_cache=use_cache)
 
-    def _parse_host_output(self, host: dict, none_val=None):
+    def _parse_host_output(self, host: dict) -> HostRecord:
         """
-        Parse the output of boto3's "ec2.describe_instances()" Reservations.Instances for data.
-        If a property cannot be retrieved, it will be replaced with `none_val`.
+        Turn one of boto3's "ec2.describe_instances()" Reservations.Instances into a HostRecord.
+        Missing properties are None.
         """
-        none_val = None
-        # @@@ E731 I want test cases first
-        _try_get_attr = lambda d, attr: d[attr] if attr in d.keys() else none_val  # noqa: E731
-        return {
-            'app_name': self.app_name,
-            'ami': _try_get_attr(host, 'ImageId'),
-            'security_group': _try_get_attr(host, 'SecurityGroups')[0]['GroupId'],
-            'instance_id': _try_get_attr(host, 'InstanceId'),
-            'instance_type': _try_get_attr(host, 'InstanceType'),
-            'public_ip': _try_get_attr(host, 'PublicIpAddress'),
-            'subnet_id': _try_get_attr(host, 'SubnetId'),
-            'vpc_id': _try_get_attr(host, 'VpcId'),
-            'state': host['State']['Name'],
-            'platform': _try_get_attr(host, 'PlatformDetails'),
-        }
+        return HostRecord.from_instance(host, app_name=self.app_name)
 
     def get_userdata(self, filename: str):
         data = None
@@ -323,95 +339,126 @@ class AWSHost(AWSResourceBase):
         return data
 
     def get_host_count(self):
-        app_hosts = quickhost.scrub_datetime(self.client.describe_instances(
-            Filters=[
-                { 'Name': f"tag:{QHC.DEFAULT_APP_NAME}", 'Values': [ self.app_name, ] },
-                { 'Name': 'instance-state-name', 'Values': ['running'] },
-            ],
-            DryRun=False,
-            MaxResults=10,
-        ))
-        count = 0
-        for r in app_hosts['Reservations']:
-            logger.debug(f"got {len(r['Instances'])} instances")
-            for host in r['Instances']:
-                if host['State']['Name'] == 'running':
-                    count += 1
-        return count
-
-    def wait_for_hosts_to_terminate(self, tgt_instances):
-        """'blocks' until hosts tagged 'app_name' have a State Name of 'running'"""
+        return len(self.snapshot.ids('running'))
+
+    def _print_waiter_progress(self, waiter: HostWaiter):
+        print("({}/{}) {}: {} Waiting: ({}) Failed: {}\r".format(
+            len(waiter.ready), waiter.total, waiter.target_state, sorted(waiter.ready), len(waiter.pending), sorted(waiter.failed)
+        ), end='')
+
+    def wait_for_hosts_to_terminate(self, tgt_instances, cancel=None):
+        """blocks until the instances in tgt_instances have a State Name of 'terminated'"""
         print(f"===================Waiting on hosts for '{self.app_name}'=========================")
-        ready_hosts = []
-        waiting_on_hosts = []
-        other_hosts = []
-        tgt_count = len(tgt_instances)
-        while True:
-            app_hosts = quickhost.scrub_datetime(self.client.describe_instances(
-                Filters=[
-                    { 'Name': f"tag:{QHC.DEFAULT_APP_NAME}", 'Values': [ self.app_name, ] },
-                    { 'Name': 'instance-state-name', 'Values': ['running', 'terminated', 'shutting-down'] },
-                ],
-                DryRun=False,
-                MaxResults=10,
-            ))
-            for r in app_hosts['Reservations']:
-                for host in r['Instances']:
-                    if host['InstanceId'] in tgt_instances:
-                        match host['State']['Name']:
-                            case 'terminated':
-                                if not (host['InstanceId'] in ready_hosts):
-                                    ready_hosts.append(host['InstanceId'])
-                            case 'shutting-down':
-                                if not (host['InstanceId'] in waiting_on_hosts):
-                                    waiting_on_hosts.append(host['InstanceId'])
-                            case _:
-                                if not (host['InstanceId'] in other_hosts):
-                                    other_hosts.append(host['InstanceId'])
-                                # @@@
-            print(f"""other: {other_hosts} ({len(ready_hosts)}/{tgt_count}) Ready: {ready_hosts} Waiting: {waiting_on_hosts}\r""", end='')
-            if len(ready_hosts) == tgt_count:
-                print()
-                return True
-            time.sleep(1)
+        waiter = HostWaiter(self.client, tgt_instances, 'terminated', progress=self._print_waiter_progress, cancel=cancel)
+        rtn = waiter.wait()
+        self.snapshot.set_states(waiter.states)
+        print()
+        return rtn
 
-    def wait_for_hosts_to_start(self, tgt_count):
-        """loops until a the specified hosts tagged as 'app_name' have a State Name of 'running'"""
+    def wait_for_hosts_to_start(self, instance_ids, cancel=None):
+        """blocks until the instances in instance_ids have a State Name of 'running'"""
         print(f"===================Waiting on hosts for '{self.app_name}'=========================")
-        ready_hosts = []
-        waiting_on_hosts = []
-        other_hosts = []
-        while True:
-            if len(ready_hosts) == int(tgt_count):
-                print()
-                return True
-            app_hosts = quickhost.scrub_datetime(self.client.describe_instances(
-                Filters=[
-                    { 'Name': f"tag:{QHC.DEFAULT_APP_NAME}", 'Values': [self.app_name,] },
-                    { 'Name': 'instance-state-name', 'Values': ['running', 'pending'] },
-                ],
-                DryRun=False,
-                MaxResults=10,
-            ))
-            for r in app_hosts['Reservations']:
-                for host in r['Instances']:
-                    match host['State']['Name']:
-                        case 'running':
-                            if not (host['InstanceId'] in ready_hosts):
-                                if host['InstanceId'] in waiting_on_hosts:  # should always be True
-                                    ready_hosts.append(host['InstanceId'])
-                                    waiting_on_hosts.remove(host['InstanceId'])
-                        case 'pending':
-                            if not (host['InstanceId'] in waiting_on_hosts):
-                                waiting_on_hosts.append(host['InstanceId'])
-                        case _:
-                            if not (host['InstanceId'] in other_hosts):
-                                logger.debug("HERE BUG")
-                                other_hosts.append(host['InstanceId'])
-            print("other: {} ({}/{}) Ready: {} Waiting: ({}): {}\r".format(
-                other_hosts, len(ready_hosts), tgt_count, ready_hosts, len(waiting_on_hosts), waiting_on_hosts
-            ), end='')
-            time.sleep(1)
+        waiter = HostWaiter(self.client, instance_ids, 'running', progress=self._print_waiter_progress, cancel=cancel)
+        rtn = waiter.wait()
+        self.snapshot.set_states(waiter.states)
+        print()
+        return rtn
+
+
+# every state but 'terminated'
+LIVE_STATES = ['pending', 'running', 'stopping', 'stopped', 'shutting-down']
+
+
+def iter_instances(client, filters: list = None, instance_ids: list = None, page_size=AWSConstants.INVENTORY_PAGE_SIZE):
+    """
+    Stream instances matching the server-side `filters` (and/or `instance_ids`),
+    one describe_instances page at a time, as HostRecords. Only the record is
+    kept, so memory use is bounded by the page size rather than the fleet size.
+    """
+    paginator = client.get_paginator('describe_instances')
+    params = {}
+    if filters:
+        params['Filters'] = filters
+    if instance_ids:
+        # describe_instances doesn't allow MaxResults together with InstanceIds
+        for i in range(0, len(instance_ids), 1000):
+            yield from _records(paginator.paginate(InstanceIds=instance_ids[i:i + 1000], **params))
+        return
+    yield from _records(paginator.paginate(**params, PaginationConfig={'PageSize': page_size}))
+
+
+def _records(pages):
+    for page in pages:
+        for reservation in page['Reservations']:
+            for instance in reservation['Instances']:
+                yield HostRecord.from_instance(instance)
+
+
+def terminate_instances(client, instance_ids: List[str], chunk_size=AWSConstants.TERMINATE_CHUNK_SIZE) -> Dict[str, str]:
+    """terminate_instances in chunks of `chunk_size` ids, returns {instance_id: new state}"""
+    states = {}
+    for i in range(0, len(instance_ids), chunk_size):
+        response = client.terminate_instances(InstanceIds=instance_ids[i:i + chunk_size])
+        states.update({t['InstanceId']: t['CurrentState']['Name'] for t in response['TerminatingInstances']})
+    return states
+
+
+class InstanceSnapshot:
+    """
+    An app's instances as of a single describe_instances sweep, kept current for
+    the rest of the operation from the run_instances/terminate_instances
+    responses and waiter results rather than by describing the app again.
+
+    EC2 calls per `aws make` with N hosts:
+        describe_instances:         1 (this snapshot) + ceil(N / 1000) (public ips after launch)
+        describe_images:            0 or 1 (see AWSImage.AMIResolver)
+        launch template calls:      0 to 3 (see AWSLaunchTemplate.LaunchTemplate)
+        run_instances:              ceil(N / LAUNCH_CHUNK_SIZE), plus top-ups (see fleet.FleetLauncher)
+        describe_instance_status:   ceil(N / 100) per waiter round
+    EC2 calls per `aws destroy` with N hosts:
+        describe_instances:         1
+        terminate_instances:        1
+        describe_instance_status:   ceil(N / 100) per waiter round
+    Waiter rounds are spaced by exponential backoff, see waiter.HostWaiter.
+    These bounds are checked by tests/test_api_call_bounds.py.
+    """
+    def __init__(self, client, app_name):
+        self.client = client
+        self.app_name = app_name
+        self._instances: Dict[str, HostRecord] = {}
+
+    def refresh(self, instance_ids: List[str] = None) -> 'InstanceSnapshot':
+        """Re-describe the whole app, or only `instance_ids`"""
+        if instance_ids is None:
+            self._instances = {h.instance_id: h for h in iter_instances(self.client, filters=[
+                _new_filter(f"tag:{QHC.DEFAULT_APP_NAME}", self.app_name),
+                _new_filter('instance-state-name', LIVE_STATES),
+            ])}
+        elif instance_ids:
+            for h in iter_instances(self.client, instance_ids=list(instance_ids)):
+                self._instances[h.instance_id] = h
+        return self
+
+    def add(self, instances: List[dict]) -> List[str]:
+        """Record instances from a run_instances response, returns their ids"""
+        ids = []
+        for i in instances:
+            h = HostRecord.from_instance(i, app_name=self.app_name)
+            self._instances[h.instance_id] = h
+            ids.append(h.instance_id)
+        return ids
+
+    def set_states(self, states: Dict[str, str]):
+        """Update instance states, e.g. from HostWaiter.states"""
+        for instance_id, state in states.items():
+            if instance_id in self._instances and state != 'unknown':
+                self._instances[instance_id].state = state
+
+    def instances(self, *states) -> List[HostRecord]:
+        return [h for h in self._instances.values() if h.state in states]
+
+    def ids(self, *states) -> List[str]:
+        return [h.instance_id for h in self.instances(*states)]
 
 
 def _new_filter(name: str, values: list | str):
@@ -21,11 +21,11 @@ from pathlib import Path
 from botocore.exceptions import ClientError
 import boto3
 
-from quickhost import scrub_datetime
 
 from .utilities import QuickhostUnauthorized, Arn
 from .constants import AWSConstants
 from .AWSResource import AWSResourceBase
+from .memo import memoize, invalidates
 
 logger = logging.getLogger(__name__)
 
@@ -37,11 +37,12 @@ class Iam(AWSResourceBase):
     """
     def __init__(self, profile, region):
         self.caller_info = self.get_caller_info(profile=profile, region=region)
+        self.profile = profile
+        self.region = region
         self.iam_user = AWSConstants.DEFAULT_IAM_USER
         self.iam_group = AWSConstants.DEFAULT_IAM_GROUP
-        session = self._get_session(profile=profile, region=region)
-        self.client = session.client('iam')
-        self.iam = session.resource('iam')
+        self.client = self._get_client('iam', profile=profile, region=region)
+        self.iam = self._get_resource('iam', profile=profile, region=region)
 
     def create(self):
         """
@@ -80,6 +81,7 @@ class Iam(AWSResourceBase):
             'iam-policies': self._describe_iam_policies(),
         }
 
+    @invalidates('qh_policy_arns')
     def destroy(self):
         """
         Delete all quickhost-aws IAM resources.
@@ -197,6 +199,7 @@ class Iam(AWSResourceBase):
                 logger.info(f"Group '{self.iam_group}' already exists.")
         return rtn
 
+    @memoize(scope=('profile',))
     def qh_policy_arns(self):
         rtn = {
             'create': None,
@@ -204,9 +207,9 @@ class Iam(AWSResourceBase):
             'update': None,
             'destroy': None,
         }
-        qh_policies = scrub_datetime(self.client.list_policies(
+        qh_policies = self.client.list_policies(
             PathPrefix='/quickhost/',
-        ))['Policies']
+        )['Policies']
 
         for policy in qh_policies:
             if policy['PolicyName'] == 'quickhost-create':
@@ -222,8 +225,9 @@ class Iam(AWSResourceBase):
                 continue
         return rtn
 
+    @invalidates('qh_policy_arns')
     def _create_qh_policy(self, action: str) -> str:
-        existing_policies = self.qh_policy_arns()
+        existing_policies = self.qh_policy_arns(use_cache=False)
         arn = None
         try:
             new_policy = self.client.create_policy(
@@ -456,7 +460,12 @@ def PolicyData(QUICKHOST_ACCOUNT):
                         "ec2:CreateTags",
                         "ec2:RunInstances",
                         "ec2:AuthorizeSecurityGroupIngress",
-                        "ec2:CreateSecurityGroup"
+                        "ec2:CreateSecurityGroup",
+                        "ec2:CreateLaunchTemplate",
+                        "ec2:CreateLaunchTemplateVersion",
+                        "ec2:StartInstances",
+                        "ec2:ModifyInstanceAttribute",
+                        "ec2:DeleteTags"
                     ],
                     "Resource": "*"
                 }
@@ -493,12 +502,16 @@ def PolicyData(QUICKHOST_ACCOUNT):
                     "Effect": "Allow",
                     "Action": [
                         "ec2:DescribeInstances",
+                        "ec2:DescribeInstanceStatus",
                         "ec2:DescribeVpcs",
                         "ec2:DescribeSubnets",
                         "ec2:DescribeInternetGateways",
                         "ec2:DescribeRouteTables",
                         "ec2:DescribeImages",
-                        "ec2:GetPasswordData"
+                        "ec2:GetPasswordData",
+                        "ec2:GetConsoleOutput",
+                        "ec2:DescribeLaunchTemplates",
+                        "ec2:DescribeLaunchTemplateVersions"
                     ],
                     "Resource": "*"
                 }
@@ -510,7 +523,11 @@ def PolicyData(QUICKHOST_ACCOUNT):
                 {
                     "Sid": "quickhostUpdate",
                     "Effect": "Allow",
-                    "Action": [],
+                    "Action": [
+                        "ec2:DescribeSecurityGroups",
+                        "ec2:AuthorizeSecurityGroupIngress",
+                        "ec2:RevokeSecurityGroupIngress"
+                    ],
                     "Resource": "*"
                 }
             ]
@@ -526,7 +543,8 @@ def PolicyData(QUICKHOST_ACCOUNT):
                         "ec2:DeleteSecurityGroup",
                         "ec2:DeleteKeyPair",
                         "ec2:DescribeKeyPairs",
-                        "ec2:TerminateInstances"
+                        "ec2:TerminateInstances",
+                        "ec2:DeleteLaunchTemplate"
                     ],
                     "Resource": "*"
                 }
@@ -0,0 +1,108 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List
+
+from .cache import DiskCache
+from .constants import AWSConstants
+from .AWSResource import AWSResourceBase
+
+logger = logging.getLogger(__name__)
+
+# os -> (image owner, image name pattern)
+IMAGE_SOURCES = {
+    'amazon-linux-2': ('amazon', 'amzn2-ami-hvm-2.0.*-{arch}-gp2'),
+    'ubuntu': ('099720109477', '*ubuntu*22.04*'),  # Canonical
+    'windows': ('amazon', 'Windows_Server-2022-English-Full-Base*'),
+    'windows-core': ('amazon', 'Windows_Server-2022-English-Core-Base*'),
+}
+
+_ami_cache = DiskCache('ami', ttl=AWSConstants.AMI_CACHE_TTL)
+
+
+class AMIResolver(AWSResourceBase):
+    """
+    Find the newest AMI for an os, cached on disk per (region, os, architecture).
+
+    NOTE: (us-east-1, 12/19/2022) Free tier eligible customers can get up to 30 GB of
+    EBS General Purpose (SSD) or Magnetic storage
+    """
+    def __init__(self, profile, region, ttl=None):
+        self.profile = profile
+        self.region = region
+        self.client = self._get_client('ec2', profile=profile, region=region)
+        self.cache = _ami_cache if ttl is None else DiskCache('ami', ttl=ttl)
+
+    def resolve(self, os='amazon-linux-2', arch='x86_64', use_cache=True) -> dict:
+        key = f"{self.region}/{os}/{arch}"
+        if use_cache:
+            image = self.cache.get(key)
+            if image is not None:
+                return image
+        image = self._describe_latest_image(os, arch)
+        self.cache.set(key, image)
+        return image
+
+    def _describe_latest_image(self, os, arch) -> dict:
+        try:
+            owner, name = IMAGE_SOURCES[os]
+        except KeyError:
+            raise Exception(f"no such image type '{os}'")
+        response = self.client.describe_images(
+            Owners=[owner],
+            Filters=[
+                {'Name': 'state', 'Values': ['available']},
+                {'Name': 'architecture', 'Values': [arch]},
+                {'Name': 'name', 'Values': [name.format(arch=arch)]},
+            ],
+            IncludeDeprecated=False,
+            DryRun=False
+        )
+        if not response['Images']:
+            raise Exception(f"no '{os}' ({arch}) images found in {self.region}")
+        # CreationDate is ISO 8601, so string comparison orders by date
+        latest = max(response['Images'], key=lambda i: i['CreationDate'])
+        logger.debug(f"latest '{os}' image in {self.region}: {latest['ImageId']} ({latest['CreationDate']})")
+        return {
+            "image_id": latest['ImageId'],
+            "ami_disk_size": latest['BlockDeviceMappings'][0]['Ebs']['VolumeSize'],
+            "device_name": latest['BlockDeviceMappings'][0]['DeviceName'],
+        }
+
+    @classmethod
+    def prefetch(
+            cls,
+            profile=AWSConstants.DEFAULT_IAM_USER,
+            regions: List[str] = AWSConstants.AVAILABLE_REGIONS,
+            oses: List[str] = list(IMAGE_SOURCES),
+            arch='x86_64') -> Dict[str, dict]:
+        """
+        Refresh the cache for every (region, os) concurrently. Returns
+        {"<region>/<os>": image}; failures are logged and skipped.
+        """
+        rtn = {}
+        with ThreadPoolExecutor(max_workers=AWSConstants.MAX_REGION_WORKERS) as pool:
+            futures = {
+                pool.submit(cls(profile=profile, region=region).resolve, os, arch, False): f"{region}/{os}"
+                for region in regions for os in oses
+            }
+            for future in as_completed(futures):
+                try:
+                    rtn[futures[future]] = future.result()
+                except Exception as e:
+                    logger.warning(f"Could not prefetch image for {futures[future]}: {e}")
+        return rtn
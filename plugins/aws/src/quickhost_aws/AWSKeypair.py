@@ -24,10 +24,10 @@ from cryptography.hazmat.primitives import serialization
 from botocore.exceptions import ClientError
 
 from quickhost import APP_CONST as C
-from quickhost import store_test_data, scrub_datetime
 
 from .utilities import get_single_result_id, handle_client_error
 from .AWSResource import AWSResourceBase
+from .memo import memoize, invalidates
 
 logger = logging.getLogger(__name__)
 
@@ -37,10 +37,11 @@ class KP(AWSResourceBase):
     CRUD for ssh keys.
     """
     def __init__(self, app_name, profile, region):
-        session = self._get_session(profile=profile, region=region)
-        self.client = session.client('ec2')
-        self.ec2 = session.resource('ec2')
+        self.client = self._get_client('ec2', profile=profile, region=region)
+        self.ec2 = self._get_resource('ec2', profile=profile, region=region)
         self.app_name = app_name
+        self.profile = profile
+        self.region = region
         self.key_name = app_name
         self.key_filepath = C.DEFAULT_SSH_KEY_FILE_DIR / f"{self.key_name}.pem"
 
@@ -84,9 +85,10 @@ class KP(AWSResourceBase):
 
         return rtn
 
+    @invalidates('describe')
     def create(self, ssh_key_filepath=None) -> bool:
         """Make a new ec2 keypair named for app"""
-        existing_key_pair = self.describe()
+        existing_key_pair = self.describe(use_cache=False)
         self.key_id = existing_key_pair['key_id']
         self.key_fingerprint = existing_key_pair['key_id']
 
@@ -106,16 +108,13 @@ class KP(AWSResourceBase):
                     },
                 ],
             )
-            safe_response = new_key
             rtn = self._create_ssh_key_file(new_key['KeyMaterial'], ssh_key_filepath)
-
-            safe_response['KeyMaterial'] = "XXXXXXXXXX"
-            store_test_data(resource='AWSKeyPair', action='create_key_pair', response_data=new_key)
             self.key_id = new_key['KeyPairId']
             self.fingerprint = new_key['KeyFingerprint']
             del new_key
             return rtn
 
+    @memoize(scope=('profile', 'region', 'key_name'))
     def describe(self, windows=False):
         rtn = {
             'key_id': None,
@@ -129,7 +128,6 @@ class KP(AWSResourceBase):
             )
             rtn['key_id'] = existing_key['KeyPairs'][0]['KeyPairId']
             rtn['key_fingerprint'] = existing_key['KeyPairs'][0]['KeyFingerprint']
-            store_test_data(resource='AWSKeypair', action='describe_key_pairs', response_data=scrub_datetime(existing_key))
             return rtn
         except ClientError as e:
             code = e.__dict__['response']['Error']['Code']
@@ -160,6 +158,7 @@ class KP(AWSResourceBase):
             padding.PKCS1v15()
         ).decode('utf-8')
 
+    @invalidates('describe')
     def destroy(self, ssh_key_file=None) -> bool:
         if not ssh_key_file:
             ssh_key_file = Path(self.app_name + '.pem')
@@ -168,11 +167,10 @@ class KP(AWSResourceBase):
             logger.warning(f"No key for app '{self.app_name}'")
             return False
         try:
-            del_key = self.client.delete_key_pair(
+            self.client.delete_key_pair(
                 KeyPairId=key_id,
                 DryRun=False
             )
-            store_test_data(resource='AWSKeyPair', action='delete_key_pair', response_data=del_key)
             if ssh_key_file.exists():
                 os.remove(ssh_key_file)
                 logger.debug(f"removed keyfile '{ssh_key_file.name}'")
@@ -0,0 +1,182 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import base64
+import hashlib
+import json
+import logging
+
+from botocore.exceptions import ClientError
+
+from quickhost import APP_CONST as QHC
+
+from .cache import DiskCache
+from .constants import AWSConstants
+from .AWSResource import AWSResourceBase
+
+logger = logging.getLogger(__name__)
+
+_template_cache = DiskCache('launch-templates', ttl=AWSConstants.LAUNCH_TEMPLATE_CACHE_TTL)
+
+# errors meaning a cached template id/version is no longer valid
+TEMPLATE_NOT_FOUND_ERRORS = {
+    'InvalidLaunchTemplateId.NotFound',
+    'InvalidLaunchTemplateName.NotFoundException',
+    'InvalidLaunchTemplateId.VersionNotFound',
+}
+
+
+class LaunchTemplate(AWSResourceBase):
+    """
+    The EC2 launch template an app's hosts are launched from, named
+    'quickhost-<app name>'.
+
+    Each distinct launch configuration (image, instance type, network, disk,
+    userdata...) is stored once as a template version whose description is a
+    hash of the configuration, so launching the same configuration again
+    reuses its version and run_instances only needs to name it. Known
+    versions are cached on disk.
+    """
+    def __init__(self, app_name, profile, region):
+        self.client = self._get_client('ec2', profile=profile, region=region)
+        self.app_name = app_name
+        self.region = region
+        self.profile = profile
+        self.name = f"quickhost-{app_name}"
+        self.cache = _template_cache
+
+    @staticmethod
+    def template_data(image: dict, instance_type, key_name, sgid, subnet_id, app_name, disk_size, userdata: str = None) -> dict:
+        """LaunchTemplateData for hosts of `app_name`; `image` is an AWSImage.AMIResolver result"""
+        data = {
+            'ImageId': image['image_id'],
+            'InstanceType': instance_type,
+            'KeyName': key_name,
+            'Monitoring': { 'Enabled': False },
+            'DisableApiTermination': False,
+            'InstanceInitiatedShutdownBehavior': 'terminate',
+            'NetworkInterfaces': [
+                {
+                    'AssociatePublicIpAddress': True,
+                    'DeviceIndex': 0,
+                    'SubnetId': subnet_id,
+                    'Groups': [ sgid ],
+                }
+            ],
+            'BlockDeviceMappings': [
+                {
+                    'DeviceName': image['device_name'],
+                    'Ebs': { 'VolumeSize': disk_size, },
+                }
+            ],
+            'TagSpecifications': [
+                { 'ResourceType': 'instance', 'Tags': [
+                    { 'Key': QHC.DEFAULT_APP_NAME, 'Value': app_name },
+                    { 'Key': "Name", 'Value': app_name },
+                ]},
+                { 'ResourceType': 'volume', 'Tags': [
+                    { 'Key': QHC.DEFAULT_APP_NAME, 'Value': app_name },
+                ]},
+            ],
+        }
+        if userdata:
+            # unlike run_instances, launch templates take userdata base64-encoded
+            data['UserData'] = base64.b64encode(userdata.encode()).decode()
+        return data
+
+    @staticmethod
+    def fingerprint(data: dict) -> str:
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()[:32]
+
+    def _cache_key(self, fingerprint):
+        return f"{self.region}/{self.name}/{fingerprint}"
+
+    def ensure(self, data: dict, use_cache=True, dry_run=False) -> dict:
+        """
+        Make sure a version of the template holds `data`.
+        Returns {'LaunchTemplateId': ..., 'Version': ...}, as taken by run_instances.
+        """
+        fp = self.fingerprint(data)
+        if use_cache:
+            spec = self.cache.get(self._cache_key(fp))
+            if spec is not None:
+                return spec
+        try:
+            template = self.client.describe_launch_templates(LaunchTemplateNames=[self.name])['LaunchTemplates'][0]
+        except ClientError as e:
+            if e.response['Error']['Code'] not in TEMPLATE_NOT_FOUND_ERRORS:
+                raise e
+            template = None
+
+        if template is None:
+            logger.info(f"creating launch template '{self.name}'")
+            response = self.client.create_launch_template(
+                LaunchTemplateName=self.name,
+                VersionDescription=fp,
+                LaunchTemplateData=data,
+                TagSpecifications=[{
+                    'ResourceType': 'launch-template',
+                    'Tags': [ { 'Key': QHC.DEFAULT_APP_NAME, 'Value': self.app_name }, ],
+                }],
+                DryRun=dry_run,
+            )
+            spec = {
+                'LaunchTemplateId': response['LaunchTemplate']['LaunchTemplateId'],
+                'Version': str(response['LaunchTemplate']['LatestVersionNumber']),
+            }
+        else:
+            spec = self._find_version(template['LaunchTemplateId'], fp)
+            if spec is None:
+                logger.info(f"adding a version to launch template '{self.name}'")
+                response = self.client.create_launch_template_version(
+                    LaunchTemplateId=template['LaunchTemplateId'],
+                    VersionDescription=fp,
+                    LaunchTemplateData=data,
+                    DryRun=dry_run,
+                )
+                spec = {
+                    'LaunchTemplateId': template['LaunchTemplateId'],
+                    'Version': str(response['LaunchTemplateVersion']['VersionNumber']),
+                }
+        logger.debug(f"launch template '{self.name}' version {spec['Version']} for {fp}")
+        self.cache.set(self._cache_key(fp), spec)
+        return spec
+
+    def _find_version(self, template_id, fingerprint) -> dict | None:
+        paginator = self.client.get_paginator('describe_launch_template_versions')
+        for page in paginator.paginate(LaunchTemplateId=template_id):
+            for v in page['LaunchTemplateVersions']:
+                if v.get('VersionDescription') == fingerprint:
+                    return {'LaunchTemplateId': template_id, 'Version': str(v['VersionNumber'])}
+        return None
+
+    def invalidate(self):
+        """Forget every cached version of this template"""
+        prefix = f"{self.region}/{self.name}/"
+        for key in [k for k in self.cache.keys() if k.startswith(prefix)]:
+            self.cache.invalidate(key)
+
+    def destroy(self) -> bool:
+        self.invalidate()
+        try:
+            self.client.delete_launch_template(LaunchTemplateName=self.name)
+            logger.info(f"deleted launch template '{self.name}'")
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] in TEMPLATE_NOT_FOUND_ERRORS:
+                logger.debug(f"No launch template found for app '{self.app_name}'")
+                return True
+            logger.error(f"(Launch Template) Unhandled botocore client exception: ({e.response['Error']['Code']}): {e.response['Error']['Message']}")
+            return False
@@ -13,17 +13,50 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import ipaddress
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List
 
 from botocore.exceptions import ClientError
 
-from quickhost import APP_CONST as C, store_test_data, scrub_datetime
+from quickhost import APP_CONST as C
 
-from .utilities import get_single_result_id, QuickhostUnauthorized, quickmemo
+from .utilities import get_single_result_id, QuickhostUnauthorized
 from .AWSResource import AWSResourceBase
+from .constants import AWSConstants
+from .memo import memoize, invalidates
 
 logger = logging.getLogger(__name__)
 
+# errors meaning there's nothing left to delete
+_GONE_ERRORS = {
+    'InvalidVpcID.NotFound',
+    'InvalidSubnetID.NotFound',
+    'InvalidRouteTableID.NotFound',
+    'InvalidAssociationID.NotFound',
+    'InvalidInternetGatewayID.NotFound',
+    'Gateway.NotAttached',
+    'InvalidGroup.NotFound',
+    'InvalidNetworkInterfaceID.NotFound',
+    'InvalidPermission.NotFound',
+}
+
+
+def carve_subnets(vpc_cidr: str, count: int, taken: List[str], prefix: int = AWSConstants.MULTI_AZ_SUBNET_PREFIX) -> List[str]:
+    """The first `count` /`prefix` blocks of `vpc_cidr` that don't overlap any of the `taken` cidrs"""
+    taken_nets = [ipaddress.ip_network(t) for t in taken]
+    free = []
+    for net in ipaddress.ip_network(vpc_cidr).subnets(new_prefix=prefix):
+        if len(free) == count:
+            break
+        if not any(net.overlaps(t) for t in taken_nets):
+            free.append(str(net))
+    if len(free) < count:
+        raise Exception(f"{vpc_cidr} only has room for {len(free)} more /{prefix} subnets, {count} are needed")
+    return free
+
 
 class AWSNetworking(AWSResourceBase):
     DefaultFilter = { 'Name': 'tag:Name', 'Values': [ C.DEFAULT_APP_NAME ] }
@@ -43,209 +76,381 @@ class AWSNetworking(AWSResourceBase):
 
     def __init__(self, app_name, profile, region, dry_run=False):
         self.app_name = app_name
-        session = self._get_session(profile=profile, region=region)
-        self.client = session.client('ec2')
-        self.ec2 = session.resource('ec2')
+        self.profile = profile
+        self.region = region
+        self.client = self._get_client('ec2', profile=profile, region=region)
         self.dry_run = dry_run
         self.vpc_id = None
         self.igw_id = None
         self.subnet_id = None
+        self.subnet_ids = []
         self.rt_id = None
 
-    def create(self, cidr_block=C.DEFAULT_VPC_CIDR):
-        self.__dict__.update(self.describe())
-        ####################################################
-        # vpc
-        ####################################################
-        vpc = None
-        if not self.vpc_id:
-            logger.debug("creating vpc...")
-            vpc = self.ec2.create_vpc(
-                CidrBlock=cidr_block,
-                DryRun=self.dry_run,
-                TagSpecifications=[ AWSNetworking.TagSpec('vpc'), ]
-            )
-            vpc.wait_until_available()
-            vpc.create_tags(Tags=[AWSNetworking.DefaultTag])
-            self.vpc_id = vpc.id
-            vpc.reload()
-            logger.info(f"Created VPC: {self.vpc_id}")
-        else:
-            logger.warning(f"Found existing vpc: {self.vpc_id}")
-            vpc = self.ec2.Vpc(self.vpc_id)
-
-        ####################################################
-        # igw
-        ####################################################
-        igw = None
-        igw_status = 'Not OK'
-        if not self.igw_id:
-            logger.debug("creating igw...")
-            igw_id = self.client.create_internet_gateway(
-                DryRun=self.dry_run,
-                TagSpecifications=[ AWSNetworking.TagSpec('internet-gateway'), ]
-            )
-            self.igw_id = get_single_result_id("InternetGateway", igw_id, plural=False)
-            igw = self.ec2.InternetGateway(self.igw_id)
-            logger.debug(f"...attaching igw ({self.igw_id}) to vpc ({self.vpc_id})...")
-            igw.attach_to_vpc(DryRun=False, VpcId=self.vpc_id)
-            igw.reload()
-            logger.info(f"Created Internet Gateway: {self.igw_id}")
-        else:
-            logger.debug(f"Have igw: {self.igw_id}")
-            igw_status = 'Check attachment'
-            igw = self.ec2.InternetGateway(self.igw_id)
-            # fixes attachment issue
-            if len(igw.attachments) == 0:
-                igw.attach_to_vpc(DryRun=False, VpcId=self.vpc_id)
-                igw.reload()
-            if len(igw.attachments) == 1 and igw.attachments[0]['VpcId'] == self.vpc_id:
-                igw_status = f"Attached to vpc {self.vpc_id}"
-            logger.warning(f"Found existing internet gateway with id: {self.igw_id} ({igw_status})")
-
-        ####################################################
-        # subnet
-        ####################################################
-        subnet = None
-        if not self.subnet_id:
-            logger.debug("creating subnet...")
-            subnet = vpc.create_subnet(
-                CidrBlock=C.DEFAULT_SUBNET_CIDR,
-                VpcId=self.vpc_id,
-                DryRun=self.dry_run,
-                TagSpecifications=[ AWSNetworking.TagSpec('subnet'), ]
-            )
-            subnet.create_tags(Tags=[AWSNetworking.DefaultTag])
-            self.subnet_id = subnet.id
-            subnet.reload()
-            logger.info(f"Created subnet: {self.subnet_id}")
-        else:
-            logger.warning(f"Found existing subnet: {self.subnet_id}")
-            subnet = self.ec2.Subnet(self.subnet_id)
-
-        ####################################################
-        # route-table
-        ####################################################
-        rt_ok = 'Not OK'
-        route_table = None
-        if not self.rt_id:
-            logger.debug("creating route table...")
-            route_table = vpc.create_route_table(
-                VpcId=self.vpc_id,
-                DryRun=self.dry_run,
-                TagSpecifications=[ AWSNetworking.TagSpec('route-table'), ]
-            )
-            logger.debug(f"creating route for igw ({self.igw_id})..")
-            route_table.create_route(
-                DestinationCidrBlock='0.0.0.0/0',
-                DryRun=False,
-                GatewayId=self.igw_id,
-                # neat
-                # NetworkInterfaceId='string',
-            )
-            self.rt_id = route_table.id
-            rt_ok = 'Check association'
-            logger.debug(f"associating route table ({self.rt_id}) with subnet ({self.subnet_id})...")
-            route_table.associate_with_subnet(
-                DryRun=False,
-                SubnetId=self.subnet_id,
-            )
-            route_table.reload()
-            if route_table.associations_attribute[0]['SubnetId'] == self.subnet_id and route_table.associations_attribute[0]['AssociationState']['State'] == "associated":
-                rt_ok = f"Associated with subnet {self.subnet_id}"
-            logger.info(f"Created Route Table. {self.rt_id=} ({rt_ok})")
-        else:
-            rt_ok = 'Check association'
-            route_table = self.ec2.RouteTable(self.rt_id)
-            if len(route_table.associations_attribute) == 0:
-                route_table.associate_with_subnet(
-                    DryRun=False,
-                    SubnetId=self.subnet_id,
-                )
-                route_table.reload()
-                rt_ok = 'ok'
-            if route_table.associations_attribute[0]['SubnetId'] == self.subnet_id and route_table.associations_attribute[0]['AssociationState']['State'] == "associated":
-                rt_ok = f"Associated with subnet {self.subnet_id}"
-            logger.warning(f"Found existing route table: {self.rt_id} ({rt_ok})")
-        # rt = self.ec2.RouteTable(self.rt_id)
+    @invalidates('describe')
+    def create(self, cidr_block=C.DEFAULT_VPC_CIDR, multi_az=False):
+        """
+        Create whatever part of the quickhost network is missing.
+        Steps only wait for what they need: the internet gateway is created
+        right away, the subnet and route table as soon as the vpc is, and the
+        default route and subnet association once their inputs exist.
+        With `multi_az`, a subnet is also added to every other available zone
+        of the region, so hosts can be spread across zones.
+        """
+        from .taskgraph import TaskGraph
+        self.__dict__.update(self.describe(use_cache=False))
+        graph = TaskGraph(max_workers=4)
+        graph.add('vpc', lambda: self._create_vpc(cidr_block))
+        graph.add('igw', self._create_igw)
+        graph.add('igw_attachment', self._attach_igw, deps=['vpc', 'igw'])
+        graph.add('subnet', self._create_subnet, deps=['vpc'])
+        graph.add('route_table', self._create_route_table, deps=['vpc'])
+        graph.add('route', self._create_default_route, deps=['route_table', 'igw_attachment'])
+        graph.add('association', self._associate_route_table, deps=['route_table', 'subnet'])
+        if multi_az:
+            graph.add('az_subnets', lambda vpc_id, subnet_id, route_table: self._create_az_subnets(vpc_id, cidr_block, route_table), deps=['vpc', 'subnet', 'route_table'])
+        graph.run()
         return {
             "vpc_id": self.vpc_id,
             "subnet_id": self.subnet_id,
+            "subnet_ids": self.subnet_ids,
             "rt_id": self.rt_id,
             "igw_id": self.igw_id,
         }
 
-    @quickmemo
-    def describe(self, use_cache=True):
+    def _waiter_config(self):
+        return {
+            'Delay': AWSConstants.NETWORKING_WAITER_DELAY,
+            'MaxAttempts': AWSConstants.NETWORKING_WAITER_MAX_ATTEMPTS,
+        }
+
+    def _create_vpc(self, cidr_block) -> str:
+        if self.vpc_id:
+            logger.warning(f"Found existing vpc: {self.vpc_id}")
+            return self.vpc_id
+        logger.debug("creating vpc...")
+        response = self.client.create_vpc(
+            CidrBlock=cidr_block,
+            DryRun=self.dry_run,
+            TagSpecifications=[ AWSNetworking.TagSpec('vpc'), ]
+        )
+        self.vpc_id = response['Vpc']['VpcId']
+        self.client.get_waiter('vpc_available').wait(VpcIds=[self.vpc_id], WaiterConfig=self._waiter_config())
+        logger.info(f"Created VPC: {self.vpc_id}")
+        return self.vpc_id
+
+    def _create_igw(self) -> str:
+        if self.igw_id:
+            logger.debug(f"Have igw: {self.igw_id}")
+            return self.igw_id
+        logger.debug("creating igw...")
+        response = self.client.create_internet_gateway(
+            DryRun=self.dry_run,
+            TagSpecifications=[ AWSNetworking.TagSpec('internet-gateway'), ]
+        )
+        self.igw_id = get_single_result_id("InternetGateway", response, plural=False)
+        logger.info(f"Created Internet Gateway: {self.igw_id}")
+        return self.igw_id
+
+    def _attach_igw(self, vpc_id, igw_id) -> str:
+        igw = self.client.describe_internet_gateways(InternetGatewayIds=[igw_id])['InternetGateways'][0]
+        attached_to = [a['VpcId'] for a in igw.get('Attachments', [])]
+        if attached_to == [vpc_id]:
+            logger.debug(f"igw '{igw_id}' is attached to vpc '{vpc_id}'")
+            return igw_id
+        if attached_to:
+            raise Exception(f"Internet Gateway '{igw_id}' is attached to {attached_to}, not '{vpc_id}'")
+        logger.debug(f"...attaching igw ({igw_id}) to vpc ({vpc_id})...")
+        self.client.attach_internet_gateway(DryRun=self.dry_run, InternetGatewayId=igw_id, VpcId=vpc_id)
+        return igw_id
+
+    def _create_subnet(self, vpc_id) -> str:
+        if self.subnet_id:
+            logger.warning(f"Found existing subnet: {self.subnet_id}")
+            return self.subnet_id
+        logger.debug("creating subnet...")
+        response = self.client.create_subnet(
+            CidrBlock=C.DEFAULT_SUBNET_CIDR,
+            VpcId=vpc_id,
+            DryRun=self.dry_run,
+            TagSpecifications=[ AWSNetworking.TagSpec('subnet'), ]
+        )
+        self.subnet_id = response['Subnet']['SubnetId']
+        self.subnet_ids = [self.subnet_id] + self.subnet_ids
+        self.client.get_waiter('subnet_available').wait(SubnetIds=[self.subnet_id], WaiterConfig=self._waiter_config())
+        logger.info(f"Created subnet: {self.subnet_id}")
+        return self.subnet_id
+
+    def _create_az_subnets(self, vpc_id, cidr_block, route_table) -> List[str]:
+        """Make sure each available zone has a quickhost subnet, returns all of them"""
+        existing = self.client.describe_subnets(Filters=[
+            AWSNetworking.DefaultFilter,
+            { 'Name': 'vpc-id', 'Values': [ vpc_id ] },
+        ])['Subnets']
+        covered = {s['AvailabilityZone'] for s in existing}
+        zones = [
+            z['ZoneName'] for z in self.client.describe_availability_zones(Filters=[
+                { 'Name': 'state', 'Values': [ 'available' ] },
+                { 'Name': 'zone-type', 'Values': [ 'availability-zone' ] },
+            ])['AvailabilityZones']
+            if z['ZoneName'] not in covered
+        ]
+        cidrs = carve_subnets(cidr_block, len(zones), [s['CidrBlock'] for s in existing])
+
+        def _create(zone, cidr):
+            subnet_id = self.client.create_subnet(
+                CidrBlock=cidr,
+                VpcId=vpc_id,
+                AvailabilityZone=zone,
+                DryRun=self.dry_run,
+                TagSpecifications=[ AWSNetworking.TagSpec('subnet'), ]
+            )['Subnet']['SubnetId']
+            self.client.get_waiter('subnet_available').wait(SubnetIds=[subnet_id], WaiterConfig=self._waiter_config())
+            self._associate_route_table(route_table, subnet_id)
+            logger.info(f"Created subnet {subnet_id} ({cidr}) in {zone}")
+            return subnet_id
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            created = list(pool.map(_create, zones, cidrs))
+        self.subnet_ids = [s['SubnetId'] for s in existing] + created
+        return self.subnet_ids
+
+    def _create_route_table(self, vpc_id) -> dict:
+        """Returns the route table, as described by ec2"""
+        if self.rt_id:
+            logger.warning(f"Found existing route table: {self.rt_id}")
+            return self.client.describe_route_tables(RouteTableIds=[self.rt_id])['RouteTables'][0]
+        logger.debug("creating route table...")
+        response = self.client.create_route_table(
+            VpcId=vpc_id,
+            DryRun=self.dry_run,
+            TagSpecifications=[ AWSNetworking.TagSpec('route-table'), ]
+        )
+        self.rt_id = response['RouteTable']['RouteTableId']
+        logger.info(f"Created Route Table: {self.rt_id}")
+        return response['RouteTable']
+
+    def _create_default_route(self, route_table, igw_id):
+        for route in route_table.get('Routes', []):
+            if route.get('DestinationCidrBlock') == '0.0.0.0/0' and route.get('GatewayId') == igw_id:
+                return
+        logger.debug(f"creating route for igw ({igw_id})..")
+        self.client.create_route(
+            RouteTableId=route_table['RouteTableId'],
+            DestinationCidrBlock='0.0.0.0/0',
+            DryRun=self.dry_run,
+            GatewayId=igw_id,
+        )
+
+    def _associate_route_table(self, route_table, subnet_id):
+        for a in route_table.get('Associations', []):
+            if a.get('SubnetId') == subnet_id:
+                logger.debug(f"route table '{route_table['RouteTableId']}' is associated with subnet '{subnet_id}'")
+                return
+        logger.debug(f"associating route table ({route_table['RouteTableId']}) with subnet ({subnet_id})...")
+        self.client.associate_route_table(
+            DryRun=self.dry_run,
+            RouteTableId=route_table['RouteTableId'],
+            SubnetId=subnet_id,
+        )
+
+    @memoize(ttl=AWSConstants.NETWORKING_CACHE_TTL, disk='networking', cache_if=lambda rtn: all(rtn.values()))
+    def describe(self):
+        """
+        Find the quickhost vpc, subnet, internet gateway and route table.
+        The four lookups run concurrently. A complete result is cached on disk
+        per (profile, region) for NETWORKING_CACHE_TTL, and dropped by create()
+        and destroy().
+        """
         logger.debug("AWSNetworking.describe")
-        try:
-            # permissions exceptions are normally caught in AWSApp.py
-            # these are special because they are called for all actions
-            existing_vpcs = self.client.describe_vpcs( Filters=[ AWSNetworking.DefaultFilter ],)
-            vpc_id = get_single_result_id("Vpc", existing_vpcs)
-            existing_subnets = self.client.describe_subnets( Filters=[ AWSNetworking.DefaultFilter ],)
-            subnet_id = get_single_result_id("Subnet", existing_subnets)
-            store_test_data(resource='AWSNetworking', action='describe_vpcs', response_data=scrub_datetime(existing_vpcs))
-            store_test_data(resource='AWSNetworking', action='describe_subnets', response_data=scrub_datetime(existing_subnets))
-        except ClientError as e:
-            code = e.response['Error']['Code']
-            if code == 'UnauthorizedOperation' or code == 'AccessDenied':
-                logger.critical(f"The user {self.caller_info['username']} couldn't perform the operation '{e.operation_name}'.")
-                raise QuickhostUnauthorized(username=self.caller_info['username'], operation=e.operation_name)
-        existing_igws = self.client.describe_internet_gateways( Filters=[ AWSNetworking.DefaultFilter ],)
-        igw_id = get_single_result_id("InternetGateway", existing_igws)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = {
+                'Vpc': pool.submit(self.client.describe_vpcs, Filters=[ AWSNetworking.DefaultFilter ]),
+                'Subnet': pool.submit(self.client.describe_subnets, Filters=[ AWSNetworking.DefaultFilter ]),
+                'InternetGateway': pool.submit(self.client.describe_internet_gateways, Filters=[ AWSNetworking.DefaultFilter ]),
+                'RouteTable': pool.submit(self.client.describe_route_tables, Filters=[ AWSNetworking.DefaultFilter ]),
+            }
+            try:
+                # permissions exceptions are normally caught in AWSApp.py
+                # these are special because they are called for all actions
+                responses = {k: f.result() for k, f in futures.items()}
+            except ClientError as e:
+                code = e.response['Error']['Code']
+                if code == 'UnauthorizedOperation' or code == 'AccessDenied':
+                    logger.critical(f"The user couldn't perform the operation '{e.operation_name}'.")
+                    raise QuickhostUnauthorized(username=self.profile, operation=e.operation_name)
+                raise e
+        vpc_id = get_single_result_id("Vpc", responses['Vpc'])
+        subnet_id, subnet_ids = self._pick_subnets(responses['Subnet']['Subnets'])
+        igw_id = get_single_result_id("InternetGateway", responses['InternetGateway'])
         if igw_id is not None:
-            igw = self.ec2.InternetGateway(igw_id)
-            if igw.attachments == []:
-                logger.warn(f"Internet Gateway '{igw_id}' is not attached to a vpc!")
+            attachments = responses['InternetGateway']['InternetGateways'][0].get('Attachments', [])
+            if attachments == []:
+                logger.warning(f"Internet Gateway '{igw_id}' is not attached to a vpc!")
             else:
-                if igw.attachments[0]['VpcId'] != vpc_id:
+                if attachments[0]['VpcId'] != vpc_id:
                     logger.error(f"Internet Gateway '{igw_id}' is not attached to the correct vpc!")
-        existing_rts = self.client.describe_route_tables(Filters=[ AWSNetworking.DefaultFilter ])
-        rt_id = get_single_result_id("RouteTable", existing_rts)
-        store_test_data(resource='AWSNetworking', action='describe_route_tables', response_data=scrub_datetime(existing_rts))
-        store_test_data(resource='AWSNetworking', action='describe_internet_gateways', response_data=scrub_datetime(existing_igws))
+        rt_id = get_single_result_id("RouteTable", responses['RouteTable'])
         return {
             "vpc_id": vpc_id,
             "subnet_id": subnet_id,
+            "subnet_ids": subnet_ids,
             "rt_id": rt_id,
             "igw_id": igw_id,
         }
 
-    def destroy(self):
+    @staticmethod
+    def _pick_subnets(subnets: List[dict]):
         """
-        Destroy all networking-related AWS resources. Requires that no apps be running.
-        - Dissociate and delete route table
-        - Detatch and delete internet gateway
-        - Delete subnet
-        - Delete VPC
+        Returns (primary subnet id, every subnet id ordered by zone). The
+        primary subnet is the one init always creates; with --multi-az there
+        is one more per zone.
         """
-        self.__dict__.update(self.describe())
-        print(self.describe())
-        if self.rt_id:
-            rt = self.ec2.RouteTable(self.rt_id)
-            rt_assoc_ids = [rtid['RouteTableAssociationId'] for rtid in rt.associations_attribute]
-            logger.debug(f"deleting {len(rt_assoc_ids)} associations on route table '{self.rt_id}'...")
-            for rtai in rt_assoc_ids:
-                self.ec2.RouteTableAssociation(rtai).delete(DryRun=False)
-            logger.debug(f"deleting route table '{self.rt_id}'...")
-            rt.delete(DryRun=False)
+        subnets = sorted(subnets, key=lambda s: s['AvailabilityZone'])
+        subnet_ids = [s['SubnetId'] for s in subnets]
+        primary = [s['SubnetId'] for s in subnets if s['CidrBlock'] == C.DEFAULT_SUBNET_CIDR]
+        if primary:
+            return primary[0], subnet_ids
+        if len(subnets) == 1:
+            return subnet_ids[0], subnet_ids
+        logger.info(f"No quickhost subnet with cidr {C.DEFAULT_SUBNET_CIDR} among {len(subnets)} subnets")
+        return None, subnet_ids
 
-        if self.igw_id:
-            igw = self.ec2.InternetGateway(self.igw_id)
-            logger.debug(f"detaching igw '{self.igw_id}' from '{self.vpc_id}'...")
-            igw.detach_from_vpc(
-                DryRun=False,
-                VpcId=self.vpc_id
-            )
-            logger.debug(f"deleting igw '{self.igw_id}'...")
-            igw.delete(DryRun=False)
-        if self.subnet_id:
-            subnet = self.ec2.Subnet(self.subnet_id)
-            logger.debug(f"deleting subnet '{self.subnet_id}'...")
-            subnet.delete(DryRun=False)
-        if self.vpc_id:
-            logger.debug(f"deleting vpc '{self.vpc_id}'...")
-            vpc = self.ec2.Vpc(self.vpc_id)
-            vpc.delete(DryRun=False)
+    @invalidates('describe')
+    def destroy(self) -> bool:
+        """
+        Destroy all networking-related AWS resources, along with anything left
+        in the vpc that would keep it from being deleted. Safe to run again
+        after a partial failure; whatever is already gone is skipped.
+
+        One concurrent sweep finds the leftovers, then deletion goes in
+        waves, each run in parallel:
+        - terminate leftover instances (and wait for them)
+        - delete unattached network interfaces, described again so those
+          the terminated instances left behind are included
+        - delete non-default security groups, disassociate the route
+          table, detach the gateway
+        - delete the route table, internet gateway and subnets
+        - delete the vpc
+        Returns False if anything could not be deleted.
+        """
+        self.__dict__.update(self.describe(use_cache=False))
+        leftovers = self._sweep() if self.vpc_id else {'instances': [], 'enis': [], 'security_groups': [], 'associations': []}
+        if leftovers['instances']:
+            logger.warning(f"terminating {len(leftovers['instances'])} instances left in vpc '{self.vpc_id}'")
+        for eni in leftovers['enis']:
+            if eni['Status'] != 'available' and eni.get('Attachment', {}).get('InstanceId') not in leftovers['instances']:
+                logger.warning(f"network interface '{eni['NetworkInterfaceId']}' ({eni.get('Description')}) is in use by something quickhost didn't make")
+
+        waves = [
+            [
+                ('terminate leftover instances', partial(self._terminate_leftovers, leftovers['instances'])),
+            ],
+            # interfaces without DeleteOnTermination only become available
+            # once their instance is gone, so this wave is built after the first
+            lambda: [('delete network interface', partial(self._delete, 'delete_network_interface', NetworkInterfaceId=eni_id))
+                     for eni_id in self._available_enis()],
+            [
+                *[('delete security group', partial(self._delete_security_group, sg)) for sg in leftovers['security_groups']],
+                *[('disassociate route table', partial(self._delete, 'disassociate_route_table', AssociationId=a)) for a in leftovers['associations']],
+                *([('detach internet gateway', partial(self._delete, 'detach_internet_gateway', InternetGatewayId=self.igw_id, VpcId=self.vpc_id))]
+                  if self.igw_id and self.vpc_id else []),
+            ],
+            [
+                *([('delete route table', partial(self._delete, 'delete_route_table', RouteTableId=self.rt_id))] if self.rt_id else []),
+                *([('delete internet gateway', partial(self._delete, 'delete_internet_gateway', InternetGatewayId=self.igw_id))] if self.igw_id else []),
+                *[('delete subnet', partial(self._delete, 'delete_subnet', SubnetId=subnet_id)) for subnet_id in self.subnet_ids],
+            ],
+            [('delete vpc', partial(self._delete, 'delete_vpc', VpcId=self.vpc_id))] if self.vpc_id else [],
+        ]
+        for wave in waves:
+            errors = self._run_wave(wave() if callable(wave) else wave)
+            if errors:
+                for what, e in errors:
+                    logger.error(f"could not {what}: {e}")
+                logger.error("networking was only partially destroyed, run destroy-plugin again once the errors above are dealt with")
+                return False
         logger.debug("Done.")
+        return True
+
+    def _sweep(self) -> dict:
+        """Find everything in the vpc that would block deleting it, in one round of concurrent describes"""
+        vpc_filter = [{ 'Name': 'vpc-id', 'Values': [ self.vpc_id ] }]
+
+        def _instances():
+            ids = []
+            for page in self.client.get_paginator('describe_instances').paginate(Filters=vpc_filter + [
+                { 'Name': 'instance-state-name', 'Values': [ 'pending', 'running', 'stopping', 'stopped', 'shutting-down' ] },
+            ]):
+                ids += [i['InstanceId'] for r in page['Reservations'] for i in r['Instances']]
+            return ids
+
+        def _enis():
+            return [eni for page in self.client.get_paginator('describe_network_interfaces').paginate(Filters=vpc_filter)
+                    for eni in page['NetworkInterfaces']]
+
+        def _security_groups():
+            return [sg for page in self.client.get_paginator('describe_security_groups').paginate(Filters=vpc_filter)
+                    for sg in page['SecurityGroups'] if sg['GroupName'] != 'default']
+
+        def _associations():
+            return [a['RouteTableAssociationId'] for rt in self.client.describe_route_tables(Filters=vpc_filter)['RouteTables']
+                    for a in rt.get('Associations', []) if not a.get('Main')]
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = {
+                'instances': pool.submit(_instances),
+                'enis': pool.submit(_enis),
+                'security_groups': pool.submit(_security_groups),
+                'associations': pool.submit(_associations),
+            }
+            return {k: f.result() for k, f in futures.items()}
+
+    def _available_enis(self) -> List[str]:
+        if not self.vpc_id:
+            return []
+        return [eni['NetworkInterfaceId'] for page in self.client.get_paginator('describe_network_interfaces').paginate(Filters=[
+            { 'Name': 'vpc-id', 'Values': [ self.vpc_id ] },
+            { 'Name': 'status', 'Values': [ 'available' ] },
+        ]) for eni in page['NetworkInterfaces']]
+
+    def _run_wave(self, steps) -> list:
+        """Run (description, fn) steps in parallel; returns [(description, exception)] for the ones that failed"""
+        errors = []
+        if not steps:
+            return errors
+        with ThreadPoolExecutor(max_workers=AWSConstants.TASK_GRAPH_WORKERS) as pool:
+            futures = [(what, pool.submit(fn)) for what, fn in steps]
+            for what, future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    errors.append((what, e))
+        return errors
+
+    def _delete(self, operation, **kwargs):
+        try:
+            getattr(self.client, operation)(DryRun=self.dry_run, **kwargs)
+            logger.debug(f"{operation} {list(kwargs.values())[0]}")
+        except ClientError as e:
+            if e.response['Error']['Code'] not in _GONE_ERRORS:
+                raise e
+
+    def _terminate_leftovers(self, instance_ids):
+        if not instance_ids:
+            return
+        from .AWSHost import terminate_instances
+        from .waiter import HostWaiter
+        terminate_instances(self.client, instance_ids)
+        if not HostWaiter(self.client, instance_ids, 'terminated').wait():
+            raise Exception(f"instances {instance_ids} did not terminate")
+
+    def _delete_security_group(self, sg):
+        # groups in the vpc can reference each other, which blocks deleting either
+        referencing = [p for p in sg.get('IpPermissions', []) if p.get('UserIdGroupPairs')]
+        if referencing:
+            try:
+                self.client.revoke_security_group_ingress(GroupId=sg['GroupId'], IpPermissions=referencing)
+            except ClientError as e:
+                if e.response['Error']['Code'] not in _GONE_ERRORS:
+                    raise e
+        self._delete('delete_security_group', GroupId=sg['GroupId'])
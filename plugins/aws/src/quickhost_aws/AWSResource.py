@@ -13,32 +13,165 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import hashlib
 import logging
+import os
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING
 
-import boto3
-
+from .cache import DiskCache
 from .constants import AWSConstants
+from .scheduler import scheduler
+
+if TYPE_CHECKING:
+    import boto3
 
 logger = logging.getLogger(__name__)
 
 
+class SessionPool:
+    """
+    Process-wide registry of boto3 sessions, clients and resources.
+
+    Sessions are keyed by (profile, region), clients and resources by
+    (profile, region, service). Everything is created lazily on first use and
+    reused for the rest of the process, so parsing ~/.aws/* and loading
+    botocore service models happens once per key instead of once per resource
+    class.
+
+    Clients are thread-safe once created, but sessions are not, so creation is
+    serialized behind a lock.
+
+    Every client gets its botocore config and rate limiting from the request
+    scheduler (see scheduler.py).
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._sessions = {}
+        self._clients = {}
+        self._resources = {}
+
+    def session(self, profile, region) -> 'boto3.Session':
+        key = (profile, region)
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    # imported here to keep plugin loading cheap, see __init__.py
+                    import boto3
+                    logger.debug(f"new session for {key}")
+                    session = boto3.session.Session(profile_name=profile, region_name=region)
+                    self._sessions[key] = session
+        return session
+
+    def client(self, service, profile, region):
+        key = (profile, region, service)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    logger.debug(f"new client for {key}")
+                    client = self.session(profile, region).client(service, config=scheduler.botocore_config())
+                    scheduler.attach(client)
+                    self._clients[key] = client
+        return client
+
+    def resource(self, service, profile, region):
+        key = (profile, region, service)
+        resource = self._resources.get(key)
+        if resource is None:
+            with self._lock:
+                resource = self._resources.get(key)
+                if resource is None:
+                    logger.debug(f"new resource for {key}")
+                    resource = self.session(profile, region).resource(service, config=scheduler.botocore_config())
+                    scheduler.attach(resource.meta.client)
+                    self._resources[key] = resource
+        return resource
+
+    def close(self):
+        """Close all pooled clients' connections and forget everything."""
+        with self._lock:
+            clients = list(self._clients.values())
+            clients += [r.meta.client for r in self._resources.values()]
+            self._clients.clear()
+            self._resources.clear()
+            self._sessions.clear()
+        for c in clients:
+            # client.close() is only available in newer botocore
+            close = getattr(c, 'close', None)
+            if close is not None:
+                close()
+
+
+_session_pool = SessionPool()
+_identity_cache = DiskCache('caller-identity', ttl=AWSConstants.CALLER_IDENTITY_TTL)
+
+
+def _credentials_stamp(session) -> str:
+    """
+    Fingerprint of the credentials a session resolves to, combined with the
+    modification time of the shared credentials file. A cached identity is only
+    valid while both are unchanged.
+    """
+    creds = session.get_credentials()
+    access_key = creds.get_frozen_credentials().access_key if creds is not None else ''
+    fingerprint = hashlib.sha256(access_key.encode()).hexdigest()[:16]
+    creds_file = Path(os.environ.get('AWS_SHARED_CREDENTIALS_FILE', Path.home() / '.aws' / 'credentials')).expanduser()
+    try:
+        mtime = creds_file.stat().st_mtime_ns
+    except OSError:
+        mtime = 0
+    return f"{fingerprint}:{mtime}"
+
+
 class AWSResourceBase:
     """
     Base class to consolidate session objects
     """
 
-    def _get_session(self, profile=AWSConstants.DEFAULT_IAM_USER, region=AWSConstants.DEFAULT_REGION) -> boto3.Session:
-        session = boto3.session.Session(profile_name=profile, region_name=region)
-        return session
+    @classmethod
+    def _get_session(cls, profile=AWSConstants.DEFAULT_IAM_USER, region=AWSConstants.DEFAULT_REGION) -> 'boto3.Session':
+        return _session_pool.session(profile=profile, region=region)
+
+    @classmethod
+    def _get_client(cls, service, profile=AWSConstants.DEFAULT_IAM_USER, region=AWSConstants.DEFAULT_REGION):
+        return _session_pool.client(service, profile=profile, region=region)
+
+    @classmethod
+    def _get_resource(cls, service, profile=AWSConstants.DEFAULT_IAM_USER, region=AWSConstants.DEFAULT_REGION):
+        return _session_pool.resource(service, profile=profile, region=region)
+
+    @classmethod
+    def _get_caller_identity(cls, profile=AWSConstants.DEFAULT_IAM_USER, region=AWSConstants.DEFAULT_REGION) -> dict:
+        """
+        sts.get_caller_identity() without ResponseMetadata, cached on disk per
+        profile (see _credentials_stamp for invalidation).
+        """
+        session = cls._get_session(profile=profile, region=region)
+        key = profile or 'default'
+        stamp = _credentials_stamp(session)
+        whoami = _identity_cache.get(key, stamp=stamp)
+        if whoami is None:
+            whoami = cls._get_client('sts', profile=profile, region=region).get_caller_identity()
+            whoami.pop('ResponseMetadata', None)
+            _identity_cache.set(key, whoami, stamp=stamp)
+        return dict(whoami)
+
+    @classmethod
+    def close_sessions(cls):
+        """Tear down the shared session pool."""
+        _session_pool.close()
 
     def get_caller_info(self, profile, region):
         session = self._get_session(profile=profile, region=region)
-        sts = session.client('sts')
-        whoami = sts.get_caller_identity()
+        whoami = self._get_caller_identity(profile=profile, region=region)
         whoami['username'] = self._get_user_name_from_arn(whoami['Arn'])
         whoami['region'] = session.region_name
         whoami['profile'] = session.profile_name
-        whoami.pop('ResponseMetadata')
 
         if self._get_user_name_from_arn(whoami['Arn']) != AWSConstants.DEFAULT_IAM_USER:
             logger.warning(f"You're about to do stuff with the non-quickhost user {whoami['Arn']}")
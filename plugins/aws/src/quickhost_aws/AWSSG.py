@@ -13,24 +13,22 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import Tuple, List
+from typing import Tuple, List, Set
 import logging
 
 import botocore.exceptions
 
-from quickhost import store_test_data, scrub_datetime
-
 from .utilities import QH_Tag, UNDEFINED
 from .AWSResource import AWSResourceBase
+from .memo import memoize, invalidates
 
 logger = logging.getLogger(__name__)
 
 
 class SG(AWSResourceBase):
     def __init__(self, app_name, profile, region, vpc_id):
-        session = self._get_session(profile=profile, region=region)
-        self.client = session.client('ec2')
-        self.ec2 = session.resource('ec2')
+        self.client = self._get_client('ec2', profile=profile, region=region)
+        self.ec2 = self._get_resource('ec2', profile=profile, region=region)
         self.app_name = app_name
         self.vpc_id = vpc_id
         self.region = region
@@ -57,6 +55,7 @@ class SG(AWSResourceBase):
             logger.debug(f"Could not get sg for app '{self.app_name}':\n{e}")
             return
 
+    @invalidates('_describe')
     def create(self, cidrs, ports, dry_run=False) -> bool:
         rtn = True
         try:
@@ -74,7 +73,6 @@ class SG(AWSResourceBase):
                 DryRun=dry_run
             )
             self.sgid = sg['GroupId']
-            store_test_data(resource='AWSSG', action='create_security_group', response_data=sg)
         except botocore.exceptions.ClientError as e:
             logger.warning(f"Security Group already exists for '{self.app_name}':\n{e}")
             self.sgid = self.get_security_group_id()
@@ -85,6 +83,7 @@ class SG(AWSResourceBase):
 
         return rtn
 
+    @invalidates('_describe')
     def destroy(self) -> bool:
         try:
             sg_id = self.get_security_group_id()
@@ -103,6 +102,7 @@ class SG(AWSResourceBase):
                 logger.error(f"(Security Group) Unhandled botocore client exception: ({e.response['Error']['Code']}): {e.response['Error']['Message']}")
                 return False
 
+    @invalidates('_describe')
     def _add_ingress(self, cidrs, ports) -> bool:
         try:
             perms = []
@@ -113,12 +113,11 @@ class SG(AWSResourceBase):
                     'IpRanges': [ { 'CidrIp': cidr, 'Description': 'made with quickhosts' } for cidr in cidrs ],
                     'ToPort': int(port),
                 })
-            response = self.client.authorize_security_group_ingress(
+            self.client.authorize_security_group_ingress(
                 GroupId=self.sgid,
                 IpPermissions=perms,
                 DryRun=False
             )
-            store_test_data(resource='AWSSG', action='authorize_security_group_ingress', response_data=scrub_datetime(response))
             self.ports = ports
             self.cidrs = cidrs
             return True
@@ -130,7 +129,19 @@ class SG(AWSResourceBase):
                 logger.error(f"(Security Group) Unhandled botocore client exception: ({e.response['Error']['Code']}): {e.response['Error']['Message']}")
                 return False
 
-    def describe(self):
+    def describe(self, use_cache=True):
+        rtn = self._describe(use_cache=use_cache)
+        if rtn is None:
+            self.sgid = None
+        else:
+            self.sgid = rtn['sgid']
+            self.ports = rtn['ports']
+            self.cidrs = rtn['cidrs']
+        return rtn
+
+    # failed lookups come back as None, don't remember those
+    @memoize(scope=('profile', 'region', 'vpc_id', 'app_name'), cache_if=lambda rtn: rtn is not None)
+    def _describe(self):
         logger.debug("AWSSG.describe")
         rtn = {
             'sgid': UNDEFINED,  # giving this a try
@@ -139,30 +150,23 @@ class SG(AWSResourceBase):
             'ok': True,
         }
         try:
-            self.sgid = None
             response = self.client.describe_security_groups(
                 Filters=[
                     { 'Name': 'vpc-id', 'Values': [ self.vpc_id, ] },
                     { 'Name': 'group-name', 'Values': [ self.app_name, ] },
                 ],
             )
-            self.sgid = response['SecurityGroups'][0]['GroupId']
             rtn['sgid'] = response['SecurityGroups'][0]['GroupId']
 
             ports, cidrs, ingress_ok = self._describe_sg_ingress(dsg_ip_permissions=response['SecurityGroups'][0]['IpPermissions'])
-            self.ports = ports
-            self.cidrs = cidrs
             rtn['ports'] = ports
             rtn['cidrs'] = cidrs
-
-            store_test_data(resource='AWSSG', action='describe_security_groups', response_data=scrub_datetime(response))
             return rtn
         except IndexError:
             logger.debug("No security group with name {} found for region {}".format(self.app_name, self.region))
             return None
         except botocore.exceptions.ClientError as e:
             if e.response['Error']['Code'] == 'InvalidGroup.NotFound':
-                self.sgid = None
                 logger.error(f"No security group found for app '{self.app_name}' (does the app exist?)")
                 rtn['sgid'] = None
                 rtn['ok'] = False
@@ -173,6 +177,92 @@ class SG(AWSResourceBase):
 
                 # @@@ uhhhh
 
+    @invalidates('_describe')
+    def update(self, ports=None, cidrs=None, default_ports=(22,), default_cidrs=(), dry_run=False) -> dict | None | bool:
+        """
+        Make the group's ingress open exactly the tcp `ports` to `cidrs`, with
+        at most one authorize and one revoke call. None keeps the ports (or
+        cidrs) the group has now, or `default_ports` (`default_cidrs`) if it
+        has none. Rules quickhost doesn't make (other protocols, port ranges,
+        ipv6, group references) are left alone.
+        Returns {'authorized': [(port, cidr)...], 'revoked': [...]}, None if
+        the app has no security group, or False if the rules could not be read or
+        changed.
+        """
+        try:
+            response = self.client.describe_security_groups(
+                Filters=[
+                    { 'Name': 'vpc-id', 'Values': [ self.vpc_id, ] },
+                    { 'Name': 'group-name', 'Values': [ self.app_name, ] },
+                ],
+            )
+        except botocore.exceptions.ClientError as e:
+            logger.error(f"(Security Group) Unhandled botocore client exception: ({e.response['Error']['Code']}): {e.response['Error']['Message']}")
+            return False
+        if not response['SecurityGroups']:
+            logger.error(f"No security group found for app '{self.app_name}' (does the app exist?)")
+            return None
+        group = response['SecurityGroups'][0]
+        self.sgid = group['GroupId']
+        current = self._tcp_rules(group['IpPermissions'])
+        if ports is None:
+            ports = {port for port, _ in current} or set(default_ports)
+        if cidrs is None:
+            cidrs = {cidr for _, cidr in current} or set(default_cidrs)
+        desired = {(int(port), cidr) for port in ports for cidr in cidrs}
+        rtn = {
+            'authorized': sorted(desired - current),
+            'revoked': sorted(current - desired),
+        }
+        if dry_run:
+            return rtn
+        try:
+            # authorize first, so access that is kept never lapses
+            if rtn['authorized']:
+                self.client.authorize_security_group_ingress(
+                    GroupId=self.sgid,
+                    IpPermissions=self._ip_permissions(rtn['authorized'], description='made with quickhosts'),
+                )
+            if rtn['revoked']:
+                self.client.revoke_security_group_ingress(
+                    GroupId=self.sgid,
+                    IpPermissions=self._ip_permissions(rtn['revoked']),
+                )
+        except botocore.exceptions.ClientError as e:
+            logger.error(f"(Security Group) Unhandled botocore client exception: ({e.response['Error']['Code']}): {e.response['Error']['Message']}")
+            return False
+        self.ports = sorted({port for port, _ in desired})
+        self.cidrs = sorted({cidr for _, cidr in desired})
+        return rtn
+
+    @staticmethod
+    def _tcp_rules(dsg_ip_permissions: dict) -> Set[Tuple[int, str]]:
+        """
+        The (port, cidr) pairs of the single-port tcp ipv4 rules. Unlike
+        _describe_sg_ingress, this keeps which cidrs each port is open to.
+        """
+        rules = set()
+        for p in dsg_ip_permissions:
+            if p['IpProtocol'] != 'tcp' or p.get('FromPort') != p.get('ToPort'):
+                continue
+            for ipr in p.get('IpRanges', []):
+                rules.add((p['FromPort'], ipr['CidrIp']))
+        return rules
+
+    @staticmethod
+    def _ip_permissions(rules, description=None) -> List[dict]:
+        """(port, cidr) pairs as IpPermissions, one entry per port"""
+        by_port = {}
+        for port, cidr in rules:
+            ipr = { 'CidrIp': cidr }
+            if description:
+                ipr['Description'] = description
+            by_port.setdefault(port, []).append(ipr)
+        return [
+            { 'FromPort': port, 'ToPort': port, 'IpProtocol': 'tcp', 'IpRanges': ranges }
+            for port, ranges in by_port.items()
+        ]
+
     def _describe_sg_ingress(self, dsg_ip_permissions: dict) -> Tuple[List[str], List[str], bool]:
         ports = []
         cidrs = []
@@ -0,0 +1,182 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import threading
+from typing import List
+
+from botocore.exceptions import ClientError
+from quickhost import APP_CONST as QHC
+
+from .constants import AWSConstants
+from .AWSResource import AWSResourceBase
+from .AWSHost import iter_instances, terminate_instances, _new_filter
+from .AWSImage import AMIResolver
+from .fleet import FleetLauncher
+
+logger = logging.getLogger(__name__)
+
+POOL_TAG = 'quickhost-pool'
+
+# run once on first boot, so members stop themselves as soon as they're booted
+_SHUTDOWN_USERDATA = {
+    'windows': "<powershell>Stop-Computer -Force</powershell>",
+    'windows-core': "<powershell>Stop-Computer -Force</powershell>",
+}
+_DEFAULT_SHUTDOWN_USERDATA = "#!/bin/sh\nshutdown -h now\n"
+
+
+class WarmPool(AWSResourceBase):
+    """
+    Stopped, already-booted instances for one (region, os, instance type),
+    which `make --use-warm-pool` starts instead of launching new hosts. The
+    same make tops the pool back up to AWSConstants.WARM_POOL_SIZE in the
+    background, so the first one only seeds it. destroy-plugin terminates
+    whatever is left along with the rest of the vpc.
+
+    Members are launched with InstanceInitiatedShutdownBehavior='stop' and
+    userdata that shuts them down after the first boot. They are tagged
+    'quickhost-pool: <os>/<instance type>' instead of with an app name, so
+    list-all and destroy-all leave them alone.
+
+    claim() hands stopped members to an app: it starts them, then moves them
+    into the app's security group, makes them terminate on shutdown and
+    retags them. Concurrent claims are settled by start_instances itself:
+    only one caller can see a member go from 'stopped' to 'pending', and the
+    others leave it alone. A started member that can't be handed over is
+    terminated rather than left running as a pool member.
+
+    Caveats: members keep the AMI and the 'quickhost-pool' key pair they were
+    launched with (ssh with quickhost-pool.pem), app userdata doesn't run
+    on them, and their volumes keep the pool's tags.
+    """
+    def __init__(self, profile, region, os, instance_type, subnet_id=None):
+        self.client = self._get_client('ec2', profile=profile, region=region)
+        self.profile = profile
+        self.region = region
+        self.os = os
+        self.instance_type = instance_type
+        self.subnet_id = subnet_id
+        self.key = f"{os}/{instance_type}"
+
+    def members(self, *states):
+        return list(iter_instances(self.client, filters=[
+            _new_filter(f"tag:{POOL_TAG}", self.key),
+            _new_filter('instance-state-name', list(states)),
+        ]))
+
+    def size(self) -> int:
+        """Members that are stopped, or on their way there"""
+        return len(self.members('pending', 'running', 'stopping', 'stopped'))
+
+    def fill(self, target: int) -> List[str]:
+        """Launch members until there are `target` of them, returns the new instance ids"""
+        missing = target - self.size()
+        if missing <= 0:
+            return []
+        return self.launch(missing)
+
+    def launch(self, count: int) -> List[str]:
+        if self.subnet_id is None:
+            raise Exception("a subnet is needed to launch warm pool members")
+        from .AWSKeypair import KP
+        KP(app_name=AWSConstants.WARM_POOL_KEY_NAME, profile=self.profile, region=self.region).create()
+        image = AMIResolver(profile=self.profile, region=self.region).resolve(self.os)
+        logger.info(f"({self.region}) launching {count} '{self.key}' warm pool members")
+        params = {
+            'ImageId': image['image_id'],
+            'InstanceType': self.instance_type,
+            'KeyName': AWSConstants.WARM_POOL_KEY_NAME,
+            'InstanceInitiatedShutdownBehavior': 'stop',
+            'UserData': _SHUTDOWN_USERDATA.get(self.os, _DEFAULT_SHUTDOWN_USERDATA),
+            'NetworkInterfaces': [
+                {
+                    'AssociatePublicIpAddress': True,
+                    'DeviceIndex': 0,
+                    'SubnetId': self.subnet_id,
+                }
+            ],
+            'TagSpecifications': [
+                { 'ResourceType': 'instance', 'Tags': [
+                    { 'Key': POOL_TAG, 'Value': self.key },
+                    { 'Key': "Name", 'Value': AWSConstants.WARM_POOL_KEY_NAME },
+                ]},
+            ],
+        }
+        return [i['InstanceId'] for i in FleetLauncher(self.client, params, count).launch()]
+
+    def fill_async(self, target: int) -> threading.Thread:
+        """
+        fill(target) on a background thread. The thread isn't a daemon, so
+        the process finishes the launch before exiting.
+        """
+        def _fill():
+            try:
+                self.fill(target)
+            except Exception as e:
+                logger.warning(f"could not refill the '{self.key}' warm pool: {e}")
+        t = threading.Thread(target=_fill, name=f"quickhost-refill-{self.key}")
+        t.start()
+        return t
+
+    def claim(self, app_name: str, count: int, sgid: str) -> List[str]:
+        """Start up to `count` stopped members as hosts of `app_name`; returns their instance ids"""
+        candidates = [h.instance_id for h in self.members('stopped')][:count]
+        claimed = []
+        for instance_id in candidates:
+            if not self._start(instance_id):
+                continue
+            try:
+                self._hand_over(instance_id, app_name, sgid)
+            except ClientError as e:
+                # a running member still tagged for the pool would never be claimed, stopped or replaced
+                logger.warning(f"could not hand warm pool member {instance_id} to '{app_name}', terminating it: {e}")
+                self._discard(instance_id)
+                continue
+            claimed.append(instance_id)
+        if claimed:
+            logger.info(f"claimed {len(claimed)} '{self.key}' warm pool members for '{app_name}'")
+        return claimed
+
+    def _hand_over(self, instance_id: str, app_name: str, sgid: str):
+        self.client.modify_instance_attribute(InstanceId=instance_id, Groups=[sgid])
+        self.client.modify_instance_attribute(InstanceId=instance_id, InstanceInitiatedShutdownBehavior={'Value': 'terminate'})
+        self.client.create_tags(Resources=[instance_id], Tags=[
+            { 'Key': QHC.DEFAULT_APP_NAME, 'Value': app_name },
+            { 'Key': "Name", 'Value': app_name },
+        ])
+        self.client.delete_tags(Resources=[instance_id], Tags=[{'Key': POOL_TAG}])
+
+    def _discard(self, instance_id: str):
+        try:
+            terminate_instances(self.client, [instance_id])
+        except ClientError as e:
+            logger.error(f"could not terminate warm pool member {instance_id}, terminate it by hand: {e}")
+
+    def _start(self, instance_id: str) -> bool:
+        """
+        Start one member; True only if this call is the one that took it out
+        of 'stopped'. A member someone else already started reports another
+        previous state, or can't be started at all while it's stopping again.
+        """
+        try:
+            response = self.client.start_instances(InstanceIds=[instance_id])
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'IncorrectInstanceState':
+                logger.debug(f"warm pool member {instance_id} was claimed elsewhere")
+            else:
+                logger.warning(f"could not start warm pool member {instance_id}: {e}")
+            return False
+        return any(i['PreviousState']['Name'] == 'stopped' for i in response['StartingInstances'])
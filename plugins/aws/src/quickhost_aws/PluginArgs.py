@@ -84,6 +84,16 @@ class AWSParser(ParserBase):
             choices=AWSConstants.AVAILABLE_REGIONS,
             default=AWSConstants.DEFAULT_REGION,
             help="AWS region in which to create initial quickhost resources")
+        parser.add_argument(
+            "--prefetch-images",
+            required=False,
+            action='store_true',
+            help="Look up the latest image for each supported OS in every region, and cache the results")
+        parser.add_argument(
+            "--multi-az",
+            required=False,
+            action='store_true',
+            help="Also create a subnet in every other availability zone of the region, so hosts can be spread across zones")
 
     def add_destroy_plugin_parser_arguments(self, parser: ArgumentParser):
         parser.add_argument(
@@ -180,6 +190,33 @@ class AWSParser(ParserBase):
             action='store',
             default=SUPPRESS,
             help="(UNTESTED) Size in GiB of root volume (30 or less qualifies for free tier)")
+        parser.add_argument(
+            "--wait-ready",
+            required=False,
+            action='store_true',
+            help="Wait until the hosts' ports (see --port) accept connections, instead of returning as soon as they are running")
+        parser.add_argument(
+            "--wait-cloud-init",
+            required=False,
+            action='store_true',
+            help="With --wait-ready, also wait for cloud-init to finish on each host, according to its console output")
+        parser.add_argument(
+            "--ready-timeout",
+            required=False,
+            type=int,
+            default=AWSConstants.PROBE_TIMEOUT,
+            help="Seconds to wait for the hosts to accept connections")
+        parser.add_argument(
+            "--use-warm-pool",
+            required=False,
+            action='store_true',
+            help="Start stopped hosts from the warm pool before launching new ones, then top the pool up in the background")
+        parser.add_argument(
+            "--no-spread",
+            dest='spread',
+            required=False,
+            action='store_false',
+            help="Launch every host in the primary subnet, even if 'init --multi-az' made subnets in other zones")
 
     def add_describe_parser_arguments(self, parser: ArgumentParser):
         parser.add_argument(
@@ -198,6 +235,27 @@ class AWSParser(ParserBase):
             required=False,
             action='store_true',
             help="For Windows instances, show the Administrator password in plaintext")
+        parser.add_argument(
+            "-w", "--watch",
+            required=False,
+            action='store_true',
+            help="Keep polling the app's hosts, and print them as they are added, removed, or change state or ip")
+        parser.add_argument(
+            "--wait-ready",
+            required=False,
+            action='store_true',
+            help="Wait until the hosts' ports accept connections (*nix 22, Windows 3389) before returning")
+        parser.add_argument(
+            "--wait-cloud-init",
+            required=False,
+            action='store_true',
+            help="With --wait-ready, also wait for cloud-init to finish on each host, according to its console output")
+        parser.add_argument(
+            "--ready-timeout",
+            required=False,
+            type=int,
+            default=AWSConstants.PROBE_TIMEOUT,
+            help="Seconds to wait for the hosts to accept connections")
 
     def add_update_parser_arguments(self, parser: ArgumentParser):
         parser.add_argument(
@@ -205,6 +263,17 @@ class AWSParser(ParserBase):
             required=True,
             default=SUPPRESS,
             help="Name of the app to update")
+        parser.add_argument(
+            "-r", "--region",
+            required=False,
+            default=AWSConstants.DEFAULT_REGION,
+            help="Region the app is in")
+        parser.add_argument(
+            "--profile",
+            required=False,
+            action='store',
+            default=AWSConstants.DEFAULT_IAM_USER,
+            help="AWS profile to update the app with")
         parser.add_argument(
             "-y", "--dry-run",
             required=False,
@@ -216,7 +285,7 @@ class AWSParser(ParserBase):
             type=int,
             action='append',
             default=SUPPRESS,
-            help="Add an open tcp port to security group, applied to all ips")
+            help="Open tcp port on the hosts, applied to all ips. When given, ports not listed are closed")
         parser.add_argument(
             "--ip",
             required=False,
@@ -225,6 +294,7 @@ class AWSParser(ParserBase):
             Whitelist additional IPv4 CIDRs for connecting to the hosts.
             All ports specified with '--port' apply to all CIDRs specified here.
             If a CIDR is not supplied with the IP address, it is assumed to be /32.
+            When given, CIDRs not listed (other than your own ip) are removed.
             """)
         parser.add_argument(
             "--instance-type",
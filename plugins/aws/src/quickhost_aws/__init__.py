@@ -13,14 +13,30 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from .AWSApp import AWSApp
-from .PluginArgs import AWSParser
-from .AWSSG import SG  # noqa: F401
+# Entry points are called by quickhost on every invocation (even for --help),
+# so they import as little as possible. Anything that needs boto3 and friends
+# is imported by the action that uses it.
 
 
 def get_parser():
+    from .PluginArgs import AWSParser
     return AWSParser
 
 
 def load_plugin():
+    from .AWSApp import AWSApp
     return AWSApp
+
+
+def __getattr__(name):
+    # lazy re-exports
+    if name == 'AWSApp':
+        from .AWSApp import AWSApp
+        return AWSApp
+    if name == 'AWSParser':
+        from .PluginArgs import AWSParser
+        return AWSParser
+    if name == 'SG':
+        from .AWSSG import SG
+        return SG
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
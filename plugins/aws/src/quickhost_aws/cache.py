@@ -0,0 +1,153 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+
+from .constants import AWSConstants
+
+logger = logging.getLogger(__name__)
+
+
+class DiskCache:
+    """
+    A small JSON file cache with a TTL, shared between quickhost invocations.
+
+    Each cache is a single file named after `name` in AWSConstants.CACHE_DIR.
+    Values must be JSON-serializable. A broken or unreadable cache file is
+    treated as empty; caching is an optimization and never an error.
+
+    Writes re-read the file and merge into it while holding an exclusive lock
+    on a sidecar '.<name>.lock' file (where fcntl is available), so
+    concurrent quickhost processes don't drop each other's entries.
+    """
+    def __init__(self, name: str, ttl: float, cache_dir: Path = None):
+        self.name = name
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._data = None
+        self._mtime = None
+
+    @property
+    def path(self) -> Path:
+        # looked up on use, so caches made at import time follow a changed CACHE_DIR
+        return Path(self.cache_dir or AWSConstants.CACHE_DIR) / f"{self.name}.json"
+
+    @property
+    def lock_path(self) -> Path:
+        return self.path.parent / f".{self.name}.lock"
+
+    def _read(self) -> dict:
+        try:
+            with self.path.open('r') as f:
+                data = json.load(f)
+            self._mtime = os.stat(self.path).st_mtime_ns
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            self._mtime = None
+            return {}
+
+    def _load(self) -> dict:
+        """The cached entries, re-read if another process changed the file"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if self._data is None or mtime != self._mtime:
+            self._data = self._read()
+        return self._data
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            lockf = open(self.lock_path, 'a')
+        except OSError as e:
+            logger.debug(f"could not lock cache '{self.path}': {e}")
+            yield
+            return
+        try:
+            fcntl.flock(lockf, fcntl.LOCK_EX)
+            yield
+        finally:
+            lockf.close()
+
+    def _update(self, change):
+        """Apply `change` to the entries on disk, under the file lock, and save them"""
+        with self._lock, self._file_lock():
+            self._data = self._read()
+            change(self._data)
+            self._save()
+
+    def _save(self):
+        tmp = None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.name}.")
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._data, f)
+            os.replace(tmp, self.path)
+            tmp = None
+            self._mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            logger.debug(f"could not write cache '{self.path}': {e}")
+        finally:
+            if tmp is not None:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+
+    def get(self, key: str, stamp=None):
+        """
+        Return the cached value for `key`, or None if there is no entry, the
+        entry is older than the TTL, or it was stored with a different `stamp`.
+        """
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is None:
+                return None
+            if time.time() - entry['t'] > self.ttl or entry.get('stamp') != stamp:
+                logger.debug(f"cache '{self.name}': stale entry for '{key}'")
+                return None
+            logger.debug(f"cache '{self.name}': hit for '{key}'")
+            return entry['v']
+
+    def set(self, key: str, value, stamp=None):
+        entry = {'t': time.time(), 'stamp': stamp, 'v': value}
+        self._update(lambda data: data.__setitem__(key, entry))
+
+    def keys(self):
+        with self._lock:
+            return list(self._load())
+
+    def invalidate(self, key: str = None):
+        """Drop `key`, or every entry when no key is given."""
+        self._update(lambda data: data.clear() if key is None else data.pop(key, None))
@@ -0,0 +1,157 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+from .constants import AWSConstants
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class ResponseCapture:
+    """
+    Record api responses for use as test data.
+
+    Enabled by setting AWSClientConfig.capture_dir (QUICKHOST_AWS_CAPTURE_DIR).
+    The request scheduler then attach()es it to every client's 'after-call'
+    event; when capture is off nothing is registered, so ordinary runs pay
+    nothing for it.
+
+    The event handler serializes the parsed response right away, since
+    callers go on to change it (e.g. pop 'ResponseMetadata'), and queues the
+    line. A writer thread compresses batches of up to `batch_size` lines (or
+    whatever arrived within `flush_interval` seconds) and appends each batch
+    as one gzip member to <directory>/capture-<pid>-<start time>.jsonl.gz.
+    Datetimes are written as strings. Each line is
+    {"t", "service", "region", "operation", "response"}.
+
+    Operations whose whole point is to hand back a secret (see
+    _UNCAPTURED_OPERATIONS) are not recorded at all, and any _SECRET_FIELDS
+    found anywhere in the other responses are blanked before they are written.
+    """
+    def __init__(self, directory, batch_size=AWSConstants.CAPTURE_BATCH_SIZE, flush_interval=AWSConstants.CAPTURE_FLUSH_INTERVAL):
+        self.path = Path(directory) / f"capture-{os.getpid()}-{int(time.time())}.jsonl.gz"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.captured = 0
+        self._queue = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._run, name='quickhost-capture', daemon=True)
+        self._writer.start()
+
+    def attach(self, client):
+        service = client.meta.service_model.service_name
+        region = client.meta.region_name
+
+        def _record(parsed, model, **kwargs):
+            if model.name in _UNCAPTURED_OPERATIONS:
+                return
+            try:
+                line = json.dumps({
+                    't': time.time(),
+                    'service': service,
+                    'region': region,
+                    'operation': model.name,
+                    'response': _redact(parsed),
+                }, default=str) + "\n"
+            except (TypeError, ValueError) as e:
+                logger.debug(f"not capturing {model.name} response: {e}")
+                return
+            self._queue.put(line)
+
+        client.meta.events.register('after-call', _record, unique_id='quickhost-capture')
+        return client
+
+    def _run(self):
+        batch = []
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+            except queue.Empty:
+                pass
+            else:
+                if len(batch) < self.batch_size and not stopping:
+                    continue
+            if batch:
+                self._write(batch)
+                batch = []
+
+    def _write(self, batch):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(self.path, 'at') as f:
+                f.write("".join(batch))
+            self.captured += len(batch)
+        except OSError as e:
+            logger.warning(f"could not write {len(batch)} captured responses to '{self.path}': {e}")
+
+    def close(self):
+        """Write out whatever is still queued and stop the writer"""
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+            logger.debug(f"captured {self.captured} responses to '{self.path}'")
+
+
+_UNCAPTURED_OPERATIONS = frozenset({
+    'CreateAccessKey',
+    'CreateKeyPair',
+    'GetConsoleOutput',
+    'GetPasswordData',
+})
+_SECRET_FIELDS = frozenset({
+    'KeyMaterial',
+    'PasswordData',
+    'SecretAccessKey',
+    'SessionToken',
+})
+
+
+def _redact(value):
+    """Copy of `value` with every _SECRET_FIELDS entry blanked, at any depth"""
+    if isinstance(value, dict):
+        return {k: "XXXXXXXXXX" if k in _SECRET_FIELDS else _redact(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_redact(v) for v in value]
+    return value
+
+
+_captures = {}
+_captures_lock = threading.Lock()
+
+
+def get_capture(directory) -> ResponseCapture:
+    """The process' ResponseCapture for `directory`, started on first use"""
+    with _captures_lock:
+        capture = _captures.get(directory)
+        if capture is None:
+            capture = ResponseCapture(directory)
+            _captures[directory] = capture
+            atexit.register(capture.close)
+        return capture
@@ -13,6 +13,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import os
+from pathlib import Path
+
+
 class AWSConstants:
     DEFAULT_HOST_OS = 'amazon-linux-2'
     DEFAULT_IAM_USER = 'quickhost-user'
@@ -38,6 +42,70 @@ class AWSConstants:
         'us-west-2'
     ]
 
+    # botocore client tuning, see AWSConfig.AWSClientConfig
+    CLIENT_RETRY_MODE = 'adaptive'
+    CLIENT_MAX_ATTEMPTS = 10
+    CLIENT_MAX_POOL_CONNECTIONS = 50
+    CLIENT_CONNECT_TIMEOUT = 5
+    CLIENT_READ_TIMEOUT = 30
+    # client-side token bucket per (region, service), sized after the EC2
+    # API's own non-mutating action bucket (100 tokens, refilled at 20/s)
+    CLIENT_REQUESTS_PER_SECOND = 20.0
+    CLIENT_REQUEST_BURST = 100
+
+    # thread pool sizes for multi-region and multi-app actions
+    MAX_REGION_WORKERS = 8
+    MAX_APP_WORKERS = 8
+    # taskgraph.TaskGraph, for the steps of a single make/destroy
+    TASK_GRAPH_WORKERS = 4
+
+    # describe_instances page size (5 - 1000)
+    INVENTORY_PAGE_SIZE = 500
+    # instance ids per terminate_instances call in bulk destroys
+    TERMINATE_CHUNK_SIZE = 1000
+
+    # fleet.FleetLauncher: hosts per run_instances call, concurrent calls, and
+    # how many times to try for hosts that didn't launch
+    LAUNCH_CHUNK_SIZE = 50
+    LAUNCH_MAX_WORKERS = 4
+    LAUNCH_MAX_ROUNDS = 3
+
+    # AWSWarmPool.WarmPool: the key pair all pool members are launched with,
+    # and the default number of members per (region, os, instance type)
+    WARM_POOL_KEY_NAME = 'quickhost-pool'
+    WARM_POOL_SIZE = 2
+
+    # waiter.HostWaiter, seconds
+    WAITER_TIMEOUT = 15 * 60
+    WAITER_MIN_DELAY = 1
+    WAITER_MAX_DELAY = 15
+    NETWORKING_WAITER_DELAY = 2
+    NETWORKING_WAITER_MAX_ATTEMPTS = 60
+    # a /16 vpc has room for 15 of these next to the default /24 subnet
+    MULTI_AZ_SUBNET_PREFIX = 20
+
+    # probe.ReadinessProbe, seconds (and simultaneous connects)
+    PROBE_TIMEOUT = 10 * 60
+    PROBE_CONNECT_TIMEOUT = 3
+    PROBE_CONCURRENCY = 256
+
+    # watch.Watcher poll interval bounds, seconds
+    WATCH_MIN_DELAY = 2
+    WATCH_MAX_DELAY = 30
+
+    # on-disk caches, see cache.py
+    CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache')) / 'quickhost' / 'aws'
+    CALLER_IDENTITY_TTL = 12 * 60 * 60
+    AMI_CACHE_TTL = 24 * 60 * 60
+    LAUNCH_TEMPLATE_CACHE_TTL = 7 * 24 * 60 * 60
+    NETWORKING_CACHE_TTL = 6 * 60 * 60
+    MEMO_TTL = 5 * 60
+    MEMO_MAXSIZE = 256
+
+    # api response capture, see capture.py
+    CAPTURE_BATCH_SIZE = 100
+    CAPTURE_FLUSH_INTERVAL = 2.0
+
     # use to determine default open port
     WindowsOSTypes = [
         "windows",
@@ -0,0 +1,183 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from botocore.exceptions import ClientError
+
+from .constants import AWSConstants
+
+logger = logging.getLogger(__name__)
+
+# run_instances errors that mean "try again later, maybe with fewer hosts"
+_CAPACITY_ERRORS = {
+    'InsufficientInstanceCapacity',
+    'InsufficientCapacity',
+    'RequestLimitExceeded',
+}
+# errors that mean the subnet's zone is out of capacity for the instance type
+_ZONE_CAPACITY_ERRORS = {
+    'InsufficientInstanceCapacity',
+    'InsufficientCapacity',
+}
+# errors that mean the subnet's zone doesn't offer the instance type at all
+_ZONE_UNSUPPORTED_ERRORS = {
+    'Unsupported',
+}
+# errors that topping up won't fix
+_LIMIT_ERRORS = {
+    'InstanceLimitExceeded',
+    'VcpuLimitExceeded',
+}
+
+
+class FleetLauncher:
+    """
+    Launch `count` instances with run_instances, `chunk_size` at a time.
+
+    Chunks are submitted concurrently, each with MinCount=1 and its own
+    ClientToken, so botocore's retries of a chunk can't launch it twice.
+    After every round the instances actually returned are counted, and any
+    shortfall (e.g. from InsufficientInstanceCapacity) is launched again in
+    the next round, up to `max_rounds` rounds with a growing pause between
+    them. Account limit errors stop the top-ups. Any other error also stops
+    them: launch() then returns the hosts other chunks did launch, so the
+    caller can keep track of them, and only raises if there are none.
+
+    With several `subnet_ids`, hosts are dealt round-robin across them (each
+    chunk launches into one subnet, as a copy of `network_interface`). A
+    subnet whose chunk hit a capacity error or came back short is left out of
+    later rounds while others still have room, so top-ups go to the zones
+    that have capacity. One whose zone doesn't offer the instance type
+    (Unsupported) is left out for good.
+
+    `params` are run_instances parameters, without MinCount, MaxCount and
+    ClientToken.
+    """
+    def __init__(
+            self,
+            client,
+            params: dict,
+            count: int,
+            chunk_size: int = AWSConstants.LAUNCH_CHUNK_SIZE,
+            max_rounds: int = AWSConstants.LAUNCH_MAX_ROUNDS,
+            max_workers: int = AWSConstants.LAUNCH_MAX_WORKERS,
+            subnet_ids: List[str] = None,
+            network_interface: dict = None):
+        self.client = client
+        self.params = params
+        self.count = count
+        self.chunk_size = max(1, chunk_size)
+        self.max_rounds = max_rounds
+        self.max_workers = max_workers
+        self.subnet_ids = list(subnet_ids or [])
+        self.network_interface = network_interface or {}
+        self.instances: List[dict] = []
+        self.placement: Dict[str, int] = Counter()
+        self._constrained = set()
+        self._unsupported = set()
+        self.errors: List[str] = []
+        self._lock = threading.Lock()
+        self._limited = False
+        self._failure: ClientError = None
+        # ClientTokens are at most 64 ascii characters
+        self._token_prefix = uuid.uuid4().hex
+
+    @property
+    def shortfall(self):
+        return self.count - len(self.instances)
+
+    def _chunks(self, n) -> List[Tuple[int, str | None]]:
+        """Split `n` hosts into (size, subnet id) run_instances calls"""
+        if not self.subnet_ids:
+            return [(min(self.chunk_size, n - i), None) for i in range(0, n, self.chunk_size)]
+        usable = [s for s in self.subnet_ids if s not in self._unsupported]
+        subnets = [s for s in usable if s not in self._constrained] or usable
+        chunks = []
+        for k, subnet_id in enumerate(subnets):
+            share = n // len(subnets) + (1 if k < n % len(subnets) else 0)
+            chunks += [(min(self.chunk_size, share - i), subnet_id) for i in range(0, share, self.chunk_size)]
+        return chunks
+
+    def _launch_chunk(self, size, subnet_id, token):
+        params = self.params
+        if subnet_id is not None:
+            params = {**params, 'NetworkInterfaces': [{**self.network_interface, 'SubnetId': subnet_id}]}
+        try:
+            response = self.client.run_instances(**params, MinCount=1, MaxCount=size, ClientToken=token)
+        except ClientError as e:
+            code = e.response['Error']['Code']
+            if code in _ZONE_UNSUPPORTED_ERRORS and subnet_id is not None:
+                logger.warning(f"not launching in {subnet_id} any more: ({code}) {e.response['Error']['Message']}")
+                with self._lock:
+                    self.errors.append(code)
+                    self._unsupported.add(subnet_id)
+                return
+            if code not in _CAPACITY_ERRORS and code not in _LIMIT_ERRORS:
+                logger.error(f"could not launch {size} hosts{f' in {subnet_id}' if subnet_id else ''}: ({code}) {e.response['Error']['Message']}")
+                with self._lock:
+                    self.errors.append(code)
+                    self._failure = self._failure or e
+                return
+            logger.warning(f"could not launch {size} hosts{f' in {subnet_id}' if subnet_id else ''}: ({code}) {e.response['Error']['Message']}")
+            with self._lock:
+                self.errors.append(code)
+                self._limited |= code in _LIMIT_ERRORS
+                if code in _ZONE_CAPACITY_ERRORS and subnet_id is not None:
+                    self._constrained.add(subnet_id)
+            return
+        launched = response['Instances']
+        with self._lock:
+            if len(launched) < size:
+                logger.warning(f"asked for {size} hosts, got {len(launched)}")
+                if subnet_id is not None:
+                    self._constrained.add(subnet_id)
+            self.instances += launched
+            self.placement[subnet_id] += len(launched)
+
+    def launch(self) -> List[dict]:
+        """Returns the run_instances Instances of every launched host"""
+        for attempt in range(self.max_rounds):
+            if self.shortfall <= 0 or self._limited or self._failure is not None:
+                break
+            if attempt > 0:
+                pause = min(AWSConstants.WAITER_MAX_DELAY, 2 ** attempt)
+                logger.info(f"{self.shortfall} of {self.count} hosts still missing, retrying in {pause}s")
+                time.sleep(pause)
+            chunks = self._chunks(self.shortfall)
+            if not chunks:
+                logger.error("none of the subnets offer the instance type")
+                break
+            logger.debug(f"launch round {attempt}: {len(chunks)} run_instances calls for {self.shortfall} hosts")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = [
+                    pool.submit(self._launch_chunk, size, subnet_id, f"{self._token_prefix}-{attempt}-{i}")
+                    for i, (size, subnet_id) in enumerate(chunks)
+                ]
+                for future in futures:
+                    future.result()
+        if self._failure is not None and not self.instances:
+            raise self._failure
+        if self.shortfall > 0:
+            logger.error(f"launched {len(self.instances)} of {self.count} hosts")
+        if self.subnet_ids:
+            logger.info(f"hosts per subnet: {dict(self.placement)}")
+        return self.instances
@@ -0,0 +1,181 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Tuple
+
+from .cache import DiskCache
+from .constants import AWSConstants
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+_registry: Dict[str, 'Memo'] = {}
+
+
+@dataclass
+class MemoStats:
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+
+class Memo:
+    """
+    Memoizes a method per (instance scope, call arguments).
+
+    The scope is the values of `scope` attributes of the bound instance,
+    ('profile', 'region') by default, so two instances for different regions
+    never share results. Entries expire after `ttl` seconds and the least
+    recently used one is evicted past `maxsize`. With `disk`, results are
+    also kept in the DiskCache of that name (and must be JSON-serializable),
+    so they survive between quickhost invocations.
+
+    Callers can pass use_cache=False to skip the lookup; the fresh result is
+    still stored. `cache_if` decides whether a result is worth keeping.
+    """
+    def __init__(
+            self,
+            fn: Callable,
+            ttl: float,
+            maxsize: int,
+            disk: str = None,
+            scope: Tuple[str, ...] = ('profile', 'region'),
+            cache_if: Callable = None):
+        functools.update_wrapper(self, fn)
+        self.fn = fn
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.scope = scope
+        self.cache_if = cache_if
+        self.disk = DiskCache(disk, ttl=ttl) if disk else None
+        self.stats = MemoStats()
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        _registry[fn.__qualname__] = self
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        bound = functools.partial(self.__call__, obj)
+        functools.update_wrapper(bound, self.fn)
+        return bound
+
+    def _scope_key(self, obj) -> str:
+        return '/'.join(str(getattr(obj, a, None)) for a in self.scope)
+
+    def _key(self, obj, args, kwargs) -> str:
+        return f"{self.fn.__qualname__}|{self._scope_key(obj)}|{args!r}|{sorted(kwargs.items())!r}"
+
+    def __call__(self, obj, *args, use_cache=True, **kwargs):
+        key = self._key(obj, args, kwargs)
+        if use_cache:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                return value
+        with self._lock:
+            self.stats.misses += 1
+        value = self.fn(obj, *args, **kwargs)
+        if self.cache_if is None or self.cache_if(value):
+            self._store(key, value)
+        return value
+
+    def _lookup(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.stats.hits += 1
+                    logger.debug(f"memo hit for {key}")
+                    return value
+                del self._entries[key]
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                with self._lock:
+                    self.stats.disk_hits += 1
+                    self._put(key, value)
+                return value
+        return _MISSING
+
+    def _put(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def _store(self, key, value):
+        with self._lock:
+            self._put(key, value)
+        # a None on disk reads back as a miss, so there's no point storing it
+        if self.disk is not None and value is not None:
+            self.disk.set(key, value)
+
+    def invalidate(self, obj=None):
+        """Drop the entries for `obj`'s scope, or every entry when no instance is given"""
+        prefix = f"{self.fn.__qualname__}|" if obj is None else f"{self.fn.__qualname__}|{self._scope_key(obj)}|"
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+            self.stats.invalidations += 1
+        if self.disk is not None:
+            for key in [k for k in self.disk.keys() if k.startswith(prefix)]:
+                self.disk.invalidate(key)
+
+
+def memoize(
+        ttl: float = AWSConstants.MEMO_TTL,
+        maxsize: int = AWSConstants.MEMO_MAXSIZE,
+        disk: str = None,
+        scope: Tuple[str, ...] = ('profile', 'region'),
+        cache_if: Callable = None):
+    """Decorator form of Memo, for methods"""
+    def decorator(fn):
+        return Memo(fn, ttl=ttl, maxsize=maxsize, disk=disk, scope=scope, cache_if=cache_if)
+    return decorator
+
+
+def invalidates(*names: str):
+    """
+    Decorate a method that changes what the memoized methods `names` of the
+    same class would return; their entries for the instance's scope are
+    dropped once it returns or raises.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return fn(self, *args, **kwargs)
+            finally:
+                for name in names:
+                    getattr(type(self), name).invalidate(self)
+        return wrapper
+    return decorator
+
+
+def memo_stats() -> Dict[str, dict]:
+    """Hit/miss counters of every memoized method, by qualified name"""
+    return {name: asdict(m.stats) for name, m in _registry.items()}
@@ -0,0 +1,152 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import asyncio
+import logging
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from botocore.exceptions import ClientError
+
+from .AWSConfig import HostRecord
+from .constants import AWSConstants
+
+logger = logging.getLogger(__name__)
+
+_CLOUD_INIT_FINISHED = re.compile(r"Cloud-init v\. \S+ finished at")
+
+
+@dataclass
+class HostReadiness:
+    """When (unix time) each of a host's ports accepted a connection, and cloud-init finished"""
+    instance_id: str
+    public_ip: str
+    ports: Dict[int, float] = field(default_factory=dict)
+    cloud_init_finished: float = None
+    wants_cloud_init: bool = False
+
+    @property
+    def ready(self) -> bool:
+        ports_open = bool(self.ports) and all(t is not None for t in self.ports.values())
+        return ports_open and (not self.wants_cloud_init or self.cloud_init_finished is not None)
+
+    @property
+    def ready_at(self) -> float | None:
+        if not self.ready:
+            return None
+        return max(list(self.ports.values()) + ([self.cloud_init_finished] if self.wants_cloud_init else []))
+
+
+class ReadinessProbe:
+    """
+    Wait until hosts are actually usable, not just 'running'.
+
+    Every (host, port) pair is probed at once on an asyncio event loop with a
+    plain TCP connect, retried with exponential backoff and jitter until it
+    succeeds or `timeout` seconds have passed. At most `concurrency` connects
+    are in flight at a time.
+
+    With `cloud_init=True`, each host's console output (get_console_output,
+    through `client`) is also polled until cloud-init reports it finished.
+    EC2 only refreshes console output every few minutes, so this is slower
+    than the port probes and is skipped for Windows hosts.
+    """
+    def __init__(
+            self,
+            hosts: List[HostRecord],
+            ports: Dict[str, List[int]],
+            client=None,
+            cloud_init=False,
+            timeout: float = AWSConstants.PROBE_TIMEOUT,
+            connect_timeout: float = AWSConstants.PROBE_CONNECT_TIMEOUT,
+            min_delay: float = AWSConstants.WAITER_MIN_DELAY,
+            max_delay: float = AWSConstants.WAITER_MAX_DELAY,
+            concurrency: int = AWSConstants.PROBE_CONCURRENCY):
+        """`ports` maps instance ids to the ports to probe on that host"""
+        self.hosts = hosts
+        self.ports = ports
+        self.client = client
+        self.cloud_init = cloud_init
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.concurrency = concurrency
+
+    def run(self) -> Dict[str, HostReadiness]:
+        """Block until every host is ready or the timeout passed; returns {instance_id: HostReadiness}"""
+        return asyncio.run(self._run())
+
+    async def _run(self) -> Dict[str, HostReadiness]:
+        deadline = time.monotonic() + self.timeout
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = {}
+        probes = []
+        for h in self.hosts:
+            wants_cloud_init = self.cloud_init and self.client is not None and h.platform != 'Windows'
+            r = HostReadiness(h.instance_id, h.public_ip, wants_cloud_init=wants_cloud_init)
+            results[h.instance_id] = r
+            if h.public_ip is None:
+                logger.warning(f"host '{h.instance_id}' has no public ip, not probing it")
+                continue
+            for port in self.ports.get(h.instance_id, []):
+                r.ports[port] = None
+                probes.append(self._probe_port(r, port, deadline, semaphore))
+            if wants_cloud_init:
+                probes.append(self._probe_cloud_init(r, deadline))
+        await asyncio.gather(*probes)
+        return results
+
+    async def _backoff(self, delay, deadline) -> float:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return delay
+        await asyncio.sleep(min(delay / 2 + random.uniform(0, delay / 2), remaining))
+        return min(self.max_delay, delay * 2)
+
+    async def _probe_port(self, r: HostReadiness, port: int, deadline: float, semaphore: asyncio.Semaphore):
+        delay = self.min_delay
+        while time.monotonic() < deadline:
+            try:
+                async with semaphore:
+                    _, writer = await asyncio.wait_for(asyncio.open_connection(r.public_ip, port), timeout=self.connect_timeout)
+                writer.close()
+                r.ports[port] = time.time()
+                logger.debug(f"{r.instance_id} ({r.public_ip}) port {port} is open")
+                return
+            except (OSError, asyncio.TimeoutError):
+                delay = await self._backoff(delay, deadline)
+        logger.warning(f"{r.instance_id} ({r.public_ip}) port {port} did not open within {self.timeout}s")
+
+    async def _probe_cloud_init(self, r: HostReadiness, deadline: float):
+        loop = asyncio.get_running_loop()
+        delay = self.max_delay
+        while time.monotonic() < deadline:
+            try:
+                response = await loop.run_in_executor(None, lambda: self.client.get_console_output(InstanceId=r.instance_id))
+            except ClientError as e:
+                # the host stays not ready, without stopping the other probes
+                logger.warning(f"{r.instance_id} could not read console output, cloud-init state unknown: ({e.response['Error']['Code']}) {e.response['Error']['Message']}")
+                return
+            # botocore base64-decodes Output for us
+            if _CLOUD_INIT_FINISHED.search(response.get('Output') or ''):
+                r.cloud_init_finished = time.time()
+                logger.debug(f"{r.instance_id} cloud-init finished")
+                return
+            delay = await self._backoff(delay, deadline)
+        logger.warning(f"{r.instance_id} cloud-init did not finish within {self.timeout}s")
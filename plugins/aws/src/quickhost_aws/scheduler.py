@@ -0,0 +1,130 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import threading
+import time
+from collections import Counter
+
+from .AWSConfig import AWSClientConfig
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. acquire() blocks until a token is available.
+    """
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class RequestScheduler:
+    """
+    Central place where every boto3 client gets its botocore Config (adaptive
+    retries, connection pool size, timeouts) and a per-(region, service) rate
+    limit.
+
+    The rate limit is applied on botocore's 'before-send' event, so retries
+    made by botocore are throttled too.
+    """
+    def __init__(self, config: AWSClientConfig = None):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        # (service, operation) -> number of api calls made, see AWSHost.InstanceSnapshot
+        self.call_counts = Counter()
+        self._count_lock = threading.Lock()
+        self.configure(config or AWSClientConfig())
+
+    def configure(self, config: AWSClientConfig):
+        """Replace the settings used for clients created from now on."""
+        with self._lock:
+            self.config = config
+            self._buckets.clear()
+
+    def botocore_config(self):
+        from botocore.config import Config
+        return Config(
+            retries={
+                'mode': self.config.retry_mode,
+                'max_attempts': self.config.max_attempts,
+            },
+            max_pool_connections=self.config.max_pool_connections,
+            connect_timeout=self.config.connect_timeout,
+            read_timeout=self.config.read_timeout,
+        )
+
+    def _bucket(self, region, service) -> TokenBucket:
+        key = (region, service)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self.config.requests_per_second, self.config.request_burst)
+                self._buckets[key] = bucket
+        return bucket
+
+    def attach(self, client):
+        """Count and rate-limit all requests sent by `client`, and capture responses if enabled."""
+        service = client.meta.service_model.service_name
+
+        def _count(model, **kwargs):
+            with self._count_lock:
+                self.call_counts[(service, model.name)] += 1
+
+        # not 'before-call': handlers there can answer the call (botocore's
+        # Stubber does, with register_first) and stop later handlers from running
+        client.meta.events.register('before-parameter-build', _count, unique_id='quickhost-count')
+        if self.config.capture_dir:
+            from .capture import get_capture
+            get_capture(self.config.capture_dir).attach(client)
+        if self.config.requests_per_second <= 0:
+            return client
+        bucket = self._bucket(client.meta.region_name, service)
+
+        def _throttle(**kwargs):
+            bucket.acquire()
+
+        client.meta.events.register('before-send', _throttle, unique_id='quickhost-throttle')
+        return client
+
+
+scheduler = RequestScheduler()
+
+
+def configure_requests(config: AWSClientConfig):
+    """
+    Change the request settings for clients created after this call, e.g. before
+    a bulk operation.
+    """
+    scheduler.configure(config)
@@ -0,0 +1,131 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+from .constants import AWSConstants
+
+logger = logging.getLogger(__name__)
+
+
+class TaskGraphError(Exception):
+    """
+    Raised by TaskGraph.run() when any task failed.
+
+    errors:             {task name: exception} for the tasks that raised
+    skipped:            tasks that never ran because something failed first
+    rolled_back:        finished tasks whose rollback ran
+    rollback_errors:    {task name: exception} for rollbacks that raised
+    """
+    def __init__(self, errors: Dict[str, Exception], skipped: List[str], rolled_back: List[str], rollback_errors: Dict[str, Exception]):
+        self.errors = errors
+        self.skipped = skipped
+        self.rolled_back = rolled_back
+        self.rollback_errors = rollback_errors
+        msg = "failed: {}".format(", ".join(f"{name} ({e})" for name, e in errors.items()))
+        if skipped:
+            msg += "; skipped: {}".format(", ".join(skipped))
+        if rolled_back:
+            msg += "; rolled back: {}".format(", ".join(rolled_back))
+        if rollback_errors:
+            msg += "; rollback failed: {}".format(", ".join(f"{name} ({e})" for name, e in rollback_errors.items()))
+        super().__init__(msg)
+
+
+@dataclass
+class Task:
+    name: str
+    fn: Callable[..., Any]
+    deps: List[str] = field(default_factory=list)
+    rollback: Callable[[Any], Any] = None
+
+
+class TaskGraph:
+    """
+    Run interdependent tasks on a thread pool.
+
+    Each task is started as soon as all of its dependencies have finished and
+    is called with their results, in the order of `deps`. A task fails by
+    raising. After the first failure no new tasks are started; once the
+    running ones are done, every finished task that has a `rollback` gets
+    rollback(result), newest first, and TaskGraphError is raised.
+
+    Tasks can only depend on tasks added before them, so the graph can't have
+    cycles.
+    """
+    def __init__(self, max_workers=AWSConstants.TASK_GRAPH_WORKERS):
+        self.max_workers = max_workers
+        self.tasks: Dict[str, Task] = {}
+        self.results: Dict[str, Any] = {}
+
+    def add(self, name: str, fn: Callable[..., Any], deps: List[str] = (), rollback: Callable[[Any], Any] = None) -> 'TaskGraph':
+        if name in self.tasks:
+            raise ValueError(f"duplicate task '{name}'")
+        for d in deps:
+            if d not in self.tasks:
+                raise ValueError(f"task '{name}' depends on unknown task '{d}'")
+        self.tasks[name] = Task(name, fn, list(deps), rollback)
+        return self
+
+    def run(self) -> Dict[str, Any]:
+        """Returns {task name: result}"""
+        errors = {}
+        finished = []
+        skipped = []
+        remaining = dict(self.tasks)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while remaining or running:
+                if errors:
+                    skipped += list(remaining)
+                    remaining.clear()
+                for name in [n for n, t in remaining.items() if all(d in self.results for d in t.deps)]:
+                    task = remaining.pop(name)
+                    logger.debug(f"starting task '{name}'")
+                    running[pool.submit(task.fn, *[self.results[d] for d in task.deps])] = name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        self.results[name] = future.result()
+                        finished.append(name)
+                    except Exception as e:
+                        logger.error(f"task '{name}' failed: {e}")
+                        errors[name] = e
+        if errors:
+            rolled_back, rollback_errors = self._rollback(finished)
+            raise TaskGraphError(errors, skipped, rolled_back, rollback_errors)
+        return self.results
+
+    def _rollback(self, finished):
+        rolled_back = []
+        rollback_errors = {}
+        for name in reversed(finished):
+            task = self.tasks[name]
+            if task.rollback is None:
+                continue
+            logger.info(f"rolling back '{name}'")
+            try:
+                task.rollback(self.results[name])
+                rolled_back.append(name)
+            except Exception as e:
+                logger.error(f"rollback of '{name}' failed: {e}")
+                rollback_errors[name] = e
+        return rolled_back, rollback_errors
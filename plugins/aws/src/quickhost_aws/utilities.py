@@ -14,14 +14,15 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import logging
-
-import boto3
-from botocore.exceptions import ClientError
+from typing import TYPE_CHECKING
 
 from quickhost import constants as C
 
 from .constants import AWSConstants
 
+if TYPE_CHECKING:
+    from botocore.exceptions import ClientError
+
 logger = logging.getLogger(__name__)
 
 
@@ -54,6 +55,7 @@ def get_single_result_id(resource_type, resource, plural=True):
 
 
 def check_running_as_user(tgt_user_name=AWSConstants.DEFAULT_IAM_USER):
+    import boto3
     sts = boto3.client('sts')
     caller_id = sts.get_caller_identity()
     iam = boto3.client('iam')
@@ -78,7 +80,7 @@ def get_ssh(key_filepath, ip, username='ec2-user'):
     print(f"ssh -i {key_filepath} {username}@{ip}")
 
 
-def handle_client_error(e: ClientError):
+def handle_client_error(e: 'ClientError'):
     code = e['Error']['Code']
     if code == 'UnauthorizedOperation':
         logger.error(f"({code}): {e.operation_name}")
@@ -94,22 +96,6 @@ class UNDEFINED:
     pass
 
 
-def quickmemo(f):
-    cache = {}
-
-    def foo(*args, **kwargs):
-        if 'use_cache' in kwargs:
-            if not kwargs['use_cache']:
-                return f(*args, **kwargs)
-        if 'a' not in cache:
-            cache['a'] = f(*args, **kwargs)
-            return cache['a']
-        else:
-            logger.debug("cache hit")
-        return cache['a']
-    return foo
-
-
 # @@@ remove unhelpful docstrings
 class QuickhostUnauthorized(Exception):
     """
@@ -0,0 +1,138 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import random
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, Set
+
+from botocore.exceptions import ClientError
+
+from .constants import AWSConstants
+
+logger = logging.getLogger(__name__)
+
+# states an instance can't come back from
+_DEAD_STATES = {'shutting-down', 'terminated'}
+_INSTANCE_ID = re.compile(r"i-[0-9a-f]+")
+
+
+class HostWaiter:
+    """
+    Wait for a known set of instances to reach `target_state`.
+
+    Polls describe_instance_status for the exact instance ids, 100 at a time,
+    with exponential backoff and jitter between rounds. Instances are moved
+    between sets as they change state, so each round only asks about
+    instances that are still outstanding.
+
+    `progress` is called as progress(waiter) whenever an instance changes
+    state. Setting `cancel` (a threading.Event) stops the wait early.
+    """
+    BATCH_SIZE = 100
+
+    def __init__(
+            self,
+            client,
+            instance_ids: Iterable[str],
+            target_state: str,
+            timeout: float = AWSConstants.WAITER_TIMEOUT,
+            min_delay: float = AWSConstants.WAITER_MIN_DELAY,
+            max_delay: float = AWSConstants.WAITER_MAX_DELAY,
+            progress: Callable[['HostWaiter'], None] = None,
+            cancel: threading.Event = None):
+        self.client = client
+        self.target_state = target_state
+        self.timeout = timeout
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.progress = progress
+        self.cancel = cancel or threading.Event()
+        self.pending: Set[str] = set(instance_ids)
+        self.ready: Set[str] = set()
+        self.failed: Set[str] = set()
+        self.states: Dict[str, str] = {i: 'unknown' for i in self.pending}
+        self.api_calls = 0
+
+    @property
+    def total(self):
+        return len(self.pending) + len(self.ready) + len(self.failed)
+
+    def _set_state(self, instance_id, state) -> bool:
+        if self.states.get(instance_id) == state:
+            return False
+        self.states[instance_id] = state
+        if state == self.target_state:
+            self.pending.discard(instance_id)
+            self.ready.add(instance_id)
+        elif state in _DEAD_STATES and self.target_state != 'terminated':
+            self.pending.discard(instance_id)
+            self.failed.add(instance_id)
+        return True
+
+    def _poll(self, batch) -> bool:
+        changed = False
+        try:
+            self.api_calls += 1
+            response = self.client.describe_instance_status(InstanceIds=batch, IncludeAllInstances=True)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'InvalidInstanceID.NotFound':
+                raise e
+            # ids returned by run_instances can take a moment to become visible,
+            # and terminated ones eventually disappear
+            missing = set(_INSTANCE_ID.findall(e.response['Error']['Message']))
+            if self.target_state == 'terminated':
+                for i in missing:
+                    changed |= self._set_state(i, 'terminated')
+            rest = [i for i in batch if i not in missing]
+            if not rest or rest == batch:
+                return changed
+            return self._poll(rest) or changed
+        for status in response['InstanceStatuses']:
+            changed |= self._set_state(status['InstanceId'], status['InstanceState']['Name'])
+        return changed
+
+    def wait(self) -> bool:
+        """
+        Block until every instance reached the target state. Returns False if any
+        instance can't get there, the deadline passed, or the wait was cancelled.
+        """
+        deadline = time.monotonic() + self.timeout
+        delay = self.min_delay
+        while self.pending:
+            outstanding = sorted(self.pending)
+            changed = False
+            for i in range(0, len(outstanding), self.BATCH_SIZE):
+                changed |= self._poll(outstanding[i:i + self.BATCH_SIZE])
+            if changed and self.progress is not None:
+                self.progress(self)
+            if not self.pending:
+                break
+            if time.monotonic() >= deadline:
+                logger.error(f"Timed out after {self.timeout}s waiting for {len(self.pending)} hosts to be '{self.target_state}': {sorted(self.pending)}")
+                return False
+            delay = self.min_delay if changed else min(self.max_delay, delay * 2)
+            # equal jitter: wait at least half the delay
+            sleep_for = min(delay / 2 + random.uniform(0, delay / 2), max(0, deadline - time.monotonic()))
+            if self.cancel.wait(sleep_for):
+                logger.warning(f"Cancelled waiting for {len(self.pending)} hosts to be '{self.target_state}'")
+                return False
+        if self.failed:
+            logger.error(f"{len(self.failed)} hosts will never be '{self.target_state}': {sorted(self.failed)}")
+            return False
+        logger.debug(f"{len(self.ready)} hosts '{self.target_state}' after {self.api_calls} api calls")
+        return True
@@ -0,0 +1,94 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List
+
+from .AWSConfig import HostRecord
+from .constants import AWSConstants
+
+logger = logging.getLogger(__name__)
+
+
+def diff_hosts(old: Dict[str, HostRecord], new: Dict[str, HostRecord]) -> List[str]:
+    """Describe what changed between two {instance_id: HostRecord} snapshots"""
+    changes = []
+    for instance_id, h in new.items():
+        before = old.get(instance_id)
+        if before is None:
+            changes.append(f"+ {instance_id} ({h.app_name}) {h.state} {h.public_ip}")
+            continue
+        if before.state != h.state:
+            changes.append(f"~ {instance_id} state {before.state} -> {h.state}")
+        if before.public_ip != h.public_ip:
+            changes.append(f"~ {instance_id} public ip {before.public_ip} -> {h.public_ip}")
+    for instance_id, h in old.items():
+        if instance_id not in new:
+            changes.append(f"- {instance_id} ({h.app_name}) terminated")
+    return changes
+
+
+class Watcher:
+    """
+    Call `fetch` repeatedly and print what `diff` says changed since the last
+    call.
+
+    Polling starts every `min_delay` seconds and backs off exponentially up to
+    `max_delay` while nothing changes; any change resets it. Runs until
+    interrupted (Ctrl-C), `cancel` is set, or `iterations` polls were made.
+    """
+    def __init__(
+            self,
+            fetch: Callable[[], dict],
+            diff: Callable[[dict, dict], List[str]],
+            min_delay: float = AWSConstants.WATCH_MIN_DELAY,
+            max_delay: float = AWSConstants.WATCH_MAX_DELAY,
+            cancel: threading.Event = None,
+            output: Callable[[str], None] = print):
+        self.fetch = fetch
+        self.diff = diff
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.cancel = cancel or threading.Event()
+        self.output = output
+
+    def run(self, initial: dict = None, iterations: int = None):
+        """`initial` is the snapshot to diff the first poll against, fetched here if not given"""
+        previous = self.fetch() if initial is None else initial
+        delay = self.min_delay
+        polls = 0
+        try:
+            while iterations is None or polls < iterations:
+                if self.cancel.wait(delay):
+                    break
+                try:
+                    current = self.fetch()
+                except Exception as e:
+                    logger.warning(f"watch: {e}")
+                    delay = min(self.max_delay, delay * 2)
+                    continue
+                finally:
+                    polls += 1
+                changes = self.diff(previous, current)
+                stamp = time.strftime('%H:%M:%S')
+                for line in changes:
+                    self.output(f"[{stamp}] {line}")
+                previous = current
+                delay = self.min_delay if changes else min(self.max_delay, delay * 2)
+        except KeyboardInterrupt:
+            pass
+        return previous
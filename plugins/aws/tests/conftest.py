@@ -0,0 +1,44 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parents[1] / 'src'))
+
+
+@pytest.fixture
+def aws_env(tmp_path, monkeypatch):
+    """
+    Fake credentials and a config with the default quickhost profile, so
+    boto3 sessions can be made, and an empty cache directory in place of
+    the user's. Calls are answered by botocore Stubbers and
+    never reach AWS.
+    """
+    from quickhost_aws.constants import AWSConstants
+    credentials = tmp_path / 'credentials'
+    credentials.write_text(
+        f"[{AWSConstants.DEFAULT_IAM_USER}]\n"
+        "aws_access_key_id = testing\n"
+        "aws_secret_access_key = testing\n"
+    )
+    config = tmp_path / 'config'
+    config.write_text(f"[profile {AWSConstants.DEFAULT_IAM_USER}]\nregion = {AWSConstants.DEFAULT_REGION}\n")
+    monkeypatch.setenv('AWS_SHARED_CREDENTIALS_FILE', str(credentials))
+    monkeypatch.setenv('AWS_CONFIG_FILE', str(config))
+    monkeypatch.setattr(AWSConstants, 'CACHE_DIR', tmp_path / 'cache')
+    return tmp_path
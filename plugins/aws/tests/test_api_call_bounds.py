@@ -0,0 +1,126 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+The per-operation EC2 call bounds documented on AWSHost.InstanceSnapshot,
+counted by scheduler.call_counts against stubbed clients.
+"""
+
+import math
+
+import pytest
+from botocore.stub import Stubber
+
+APP_NAME = 'bounds-test'
+REGION = 'us-west-2'
+# small enough that the larger cases need several describe_instance_status calls per round
+WAITER_BATCH_SIZE = 40
+
+
+def _instance_ids(n):
+    return [f"i-{i:017x}" for i in range(n)]
+
+
+def _instance(instance_id, state):
+    return {
+        'InstanceId': instance_id,
+        'State': {'Name': state, 'Code': 0},
+        'Tags': [{'Key': 'quickhost', 'Value': APP_NAME}],
+    }
+
+
+def _statuses(ids, state):
+    return {'InstanceStatuses': [{'InstanceId': i, 'InstanceState': {'Name': state, 'Code': 0}} for i in ids]}
+
+
+def _ec2_calls(scheduler):
+    return {op: n for (service, op), n in scheduler.call_counts.items() if service == 'ec2'}
+
+
+@pytest.fixture
+def host(aws_env, monkeypatch):
+    from quickhost_aws.AWSHost import AWSHost
+    from quickhost_aws.scheduler import scheduler
+    from quickhost_aws import waiter
+    monkeypatch.setattr(waiter.HostWaiter, 'BATCH_SIZE', WAITER_BATCH_SIZE)
+    h = AWSHost(app_name=APP_NAME, profile='quickhost-user', region=REGION)
+    scheduler.call_counts.clear()
+    return h
+
+
+@pytest.mark.parametrize('n', [1, 250])
+def test_destroy_call_bound(host, n):
+    from quickhost_aws.scheduler import scheduler
+    from quickhost_aws.constants import AWSConstants
+    ids = _instance_ids(n)
+    with Stubber(host.client) as stub:
+        stub.add_response('describe_instances', {'Reservations': [{'Instances': [_instance(i, 'running') for i in ids]}]})
+        for i in range(0, n, AWSConstants.TERMINATE_CHUNK_SIZE):
+            chunk = ids[i:i + AWSConstants.TERMINATE_CHUNK_SIZE]
+            stub.add_response('terminate_instances', {'TerminatingInstances': [
+                {'InstanceId': i, 'CurrentState': {'Name': 'shutting-down', 'Code': 32}} for i in chunk
+            ]})
+        for i in range(0, n, WAITER_BATCH_SIZE):
+            stub.add_response('describe_instance_status', _statuses(ids[i:i + WAITER_BATCH_SIZE], 'terminated'))
+        assert host.destroy() is True
+        stub.assert_no_pending_responses()
+    calls = _ec2_calls(scheduler)
+    assert calls['DescribeInstances'] == 1
+    assert calls['TerminateInstances'] <= math.ceil(n / AWSConstants.TERMINATE_CHUNK_SIZE)
+    # one waiter round, since every host was terminated on the first poll
+    assert calls['DescribeInstanceStatus'] <= math.ceil(n / WAITER_BATCH_SIZE)
+    assert sum(calls.values()) <= 1 + math.ceil(n / AWSConstants.TERMINATE_CHUNK_SIZE) + math.ceil(n / WAITER_BATCH_SIZE)
+
+
+@pytest.mark.parametrize('n', [1, 120])
+def test_make_call_bound(host, n):
+    from quickhost_aws.scheduler import scheduler
+    from quickhost_aws.constants import AWSConstants
+    ids = _instance_ids(n)
+    chunks = math.ceil(n / AWSConstants.LAUNCH_CHUNK_SIZE)
+    image = {'image_id': 'ami-12345678', 'device_name': '/dev/xvda', 'ami_disk_size': 8}
+    with Stubber(host.client) as stub:
+        # the snapshot: no hosts yet
+        stub.add_response('describe_instances', {'Reservations': []})
+        stub.add_client_error('describe_launch_templates', service_error_code='InvalidLaunchTemplateName.NotFoundException')
+        stub.add_response('create_launch_template', {'LaunchTemplate': {'LaunchTemplateId': 'lt-1', 'LatestVersionNumber': 1}})
+        for k in range(chunks):
+            chunk = ids[k * AWSConstants.LAUNCH_CHUNK_SIZE:(k + 1) * AWSConstants.LAUNCH_CHUNK_SIZE]
+            stub.add_response('run_instances', {'Instances': [_instance(i, 'pending') for i in chunk]})
+        for i in range(0, n, WAITER_BATCH_SIZE):
+            stub.add_response('describe_instance_status', _statuses(ids[i:i + WAITER_BATCH_SIZE], 'running'))
+        # public ips
+        stub.add_response('describe_instances', {'Reservations': [{'Instances': [_instance(i, 'running') for i in ids]}]})
+        rtn = host.create(
+            num_hosts=n,
+            instance_type='t2.micro',
+            sgid='sg-1',
+            subnet_id='subnet-1',
+            userdata=None,
+            key_name=APP_NAME,
+            _os='amazon-linux-2',
+            image=image,
+            wait_ready=False,
+        )
+        stub.assert_no_pending_responses()
+    assert rtn['num_launched'] == n
+    calls = _ec2_calls(scheduler)
+    assert calls['DescribeInstances'] <= 1 + math.ceil(n / 1000)
+    assert calls.get('DescribeImages', 0) <= 1
+    template_calls = sum(calls.get(op, 0) for op in (
+        'DescribeLaunchTemplates', 'DescribeLaunchTemplateVersions', 'CreateLaunchTemplate', 'CreateLaunchTemplateVersion'))
+    assert template_calls <= 3
+    assert calls['RunInstances'] == chunks
+    assert calls['DescribeInstanceStatus'] <= math.ceil(n / WAITER_BATCH_SIZE)
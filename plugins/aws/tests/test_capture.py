@@ -0,0 +1,85 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import gzip
+import json
+
+import boto3
+from botocore.stub import Stubber
+
+from quickhost_aws.capture import ResponseCapture, _redact
+
+
+def test_redact_nested_secrets():
+    response = {
+        'AccessKey': {'AccessKeyId': 'AKIAEXAMPLE', 'SecretAccessKey': 'secret'},
+        'Credentials': [{'SessionToken': 'token', 'Expiration': 'soon'}],
+        'KeyMaterial': 'private key',
+    }
+    redacted = _redact(response)
+    assert redacted['AccessKey'] == {'AccessKeyId': 'AKIAEXAMPLE', 'SecretAccessKey': 'XXXXXXXXXX'}
+    assert redacted['Credentials'] == [{'SessionToken': 'XXXXXXXXXX', 'Expiration': 'soon'}]
+    assert redacted['KeyMaterial'] == 'XXXXXXXXXX'
+    assert response['AccessKey']['SecretAccessKey'] == 'secret'
+
+
+def test_secret_operations_are_not_captured(tmp_path):
+    iam = boto3.client('iam', region_name='us-east-1', aws_access_key_id='x', aws_secret_access_key='x')
+    capture = ResponseCapture(tmp_path, flush_interval=0.01)
+    capture.attach(iam)
+    with Stubber(iam) as stub:
+        stub.add_response('create_access_key', {'AccessKey': {
+            'UserName': 'quickhost-user',
+            'AccessKeyId': 'AKIAEXAMPLEEXAMPLE',
+            'Status': 'Active',
+            'SecretAccessKey': 'secret',
+        }})
+        stub.add_response('get_user', {'User': {
+            'Path': '/',
+            'UserName': 'quickhost-user',
+            'UserId': 'AIDAEXAMPLEEXAMPLE',
+            'Arn': 'arn:aws:iam::123456789012:user/quickhost-user',
+            'CreateDate': '2022-01-01T00:00:00Z',
+        }})
+        iam.create_access_key(UserName='quickhost-user')
+        iam.get_user()
+    capture.close()
+
+    with gzip.open(capture.path, 'rt') as f:
+        text = f.read()
+    assert [json.loads(line)['operation'] for line in text.splitlines()] == ['GetUser']
+    assert 'secret' not in text
+
+
+def test_capture_is_not_affected_by_callers_changing_the_response(tmp_path):
+    sts = boto3.client('sts', region_name='us-east-1', aws_access_key_id='x', aws_secret_access_key='x')
+    capture = ResponseCapture(tmp_path, flush_interval=0.01)
+    capture.attach(sts)
+    with Stubber(sts) as stub:
+        stub.add_response('get_caller_identity', {
+            'UserId': 'AIDAEXAMPLEEXAMPLE',
+            'Account': '123456789012',
+            'Arn': 'arn:aws:iam::123456789012:user/quickhost-user',
+            'ResponseMetadata': {'RequestId': 'request-1'},
+        })
+        whoami = sts.get_caller_identity()
+        whoami.pop('ResponseMetadata')
+        whoami['Arn'] = 'changed'
+    capture.close()
+
+    with gzip.open(capture.path, 'rt') as f:
+        response = json.loads(f.read())['response']
+    assert response['Arn'] == 'arn:aws:iam::123456789012:user/quickhost-user'
+    assert 'ResponseMetadata' in response
@@ -0,0 +1,65 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import itertools
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from quickhost_aws.fleet import FleetLauncher
+
+_ids = itertools.count()
+
+
+def _ec2(fail):
+    """A client whose run_instances fails with `fail(subnet id, chunk)` -> error code or None"""
+    client = MagicMock()
+
+    def run_instances(MinCount, MaxCount, ClientToken, NetworkInterfaces=None, **params):
+        subnet_id = NetworkInterfaces[0]['SubnetId'] if NetworkInterfaces else None
+        code = fail(subnet_id, int(ClientToken.rsplit('-', 1)[1]))
+        if code:
+            raise ClientError({'Error': {'Code': code, 'Message': code}}, 'RunInstances')
+        return {'Instances': [{'InstanceId': f"i-{next(_ids):017x}", 'SubnetId': subnet_id} for _ in range(MaxCount)]}
+
+    client.run_instances.side_effect = run_instances
+    return client
+
+
+def test_failed_chunk_keeps_the_hosts_other_chunks_launched():
+    client = _ec2(lambda subnet_id, chunk: 'InvalidParameterValue' if chunk == 1 else None)
+    fleet = FleetLauncher(client, {}, 30, chunk_size=10, max_rounds=3)
+    instances = fleet.launch()
+    assert len(instances) == 20
+    assert fleet.errors == ['InvalidParameterValue']
+    # no top-up round after an error retrying won't fix
+    assert client.run_instances.call_count == 3
+
+
+def test_error_is_raised_when_nothing_launched():
+    fleet = FleetLauncher(_ec2(lambda subnet_id, chunk: 'InvalidParameterValue'), {}, 5, chunk_size=10)
+    with pytest.raises(ClientError):
+        fleet.launch()
+
+
+def test_subnet_without_the_instance_type_is_skipped(monkeypatch):
+    monkeypatch.setattr('quickhost_aws.fleet.time.sleep', lambda seconds: None)
+    client = _ec2(lambda subnet_id, chunk: 'Unsupported' if subnet_id == 'subnet-b' else None)
+    fleet = FleetLauncher(client, {}, 30, chunk_size=10, subnet_ids=['subnet-a', 'subnet-b', 'subnet-c'])
+    instances = fleet.launch()
+    assert len(instances) == 30
+    assert fleet.placement == {'subnet-a': 15, 'subnet-c': 15}
+    assert fleet.errors == ['Unsupported']
@@ -0,0 +1,64 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# quickhost loads the plugin's parser on every invocation, even for --help
+IMPORT_TIME_BUDGET = 0.5
+NEW_MODULES_BUDGET = 150
+HEAVY_MODULES = ['boto3', 'botocore', 'yaml', 'cryptography']
+
+_PROBE = """
+import argparse, json, sys, time
+before = set(sys.modules)
+t = time.perf_counter()
+import quickhost_aws
+parser = argparse.ArgumentParser()
+quickhost_aws.get_parser()(config_file=sys.argv[1]).add_subparsers(parser)
+elapsed = time.perf_counter() - t
+print(json.dumps({
+    'elapsed': elapsed,
+    'new_modules': sorted(set(sys.modules) - before),
+}))
+"""
+
+
+def _probe(tmp_path):
+    config_file = tmp_path / 'quickhost.conf'
+    config_file.touch()
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([str(Path(__file__).parents[1] / 'src'), env.get('PYTHONPATH', '')])
+    # a fresh interpreter, so nothing is imported already
+    out = subprocess.run(
+        [sys.executable, '-c', _PROBE, str(config_file)],
+        check=True, capture_output=True, text=True, env=env,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def test_get_parser_does_not_import_heavy_dependencies(tmp_path):
+    result = _probe(tmp_path)
+    for name in HEAVY_MODULES:
+        assert name not in result['new_modules'], f"{name} was imported by get_parser()"
+
+
+def test_get_parser_import_budget(tmp_path):
+    result = _probe(tmp_path)
+    assert len(result['new_modules']) <= NEW_MODULES_BUDGET, result['new_modules']
+    assert result['elapsed'] <= IMPORT_TIME_BUDGET
@@ -0,0 +1,63 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import pytest
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+
+APP_NAME = 'rollback-test'
+INSTANCE_ID = 'i-0123456789abcdef0'
+
+
+def _instance(state):
+    return {
+        'InstanceId': INSTANCE_ID,
+        'State': {'Name': state, 'Code': 0},
+        'Tags': [{'Key': 'quickhost', 'Value': APP_NAME}],
+    }
+
+
+def test_hosts_of_a_failed_create_are_terminated(aws_env):
+    from quickhost_aws.AWSHost import AWSHost
+    host = AWSHost(app_name=APP_NAME, profile='quickhost-user', region='us-west-2')
+    with Stubber(host.client) as stub:
+        stub.add_response('describe_instances', {'Reservations': []})
+        stub.add_client_error('describe_launch_templates', service_error_code='InvalidLaunchTemplateName.NotFoundException')
+        stub.add_response('create_launch_template', {'LaunchTemplate': {'LaunchTemplateId': 'lt-1', 'LatestVersionNumber': 1}})
+        stub.add_response('run_instances', {'Instances': [_instance('pending')]})
+        # the host launched, then waiting on it fails
+        stub.add_client_error('describe_instance_status', service_error_code='UnauthorizedOperation')
+        with pytest.raises(ClientError):
+            host.create(
+                num_hosts=1,
+                instance_type='t2.micro',
+                sgid='sg-1',
+                subnet_id='subnet-1',
+                userdata=None,
+                key_name=APP_NAME,
+                _os='amazon-linux-2',
+                image={'image_id': 'ami-12345678', 'device_name': '/dev/xvda', 'ami_disk_size': 8},
+                wait_ready=False,
+            )
+        # not visible to describe_instances yet, but create() recorded it
+        stub.add_response('describe_instances', {'Reservations': []})
+        stub.add_response('terminate_instances', {'TerminatingInstances': [
+            {'InstanceId': INSTANCE_ID, 'CurrentState': {'Name': 'shutting-down', 'Code': 32}},
+        ]}, {'InstanceIds': [INSTANCE_ID]})
+        stub.add_response('describe_instance_status', {'InstanceStatuses': [
+            {'InstanceId': INSTANCE_ID, 'InstanceState': {'Name': 'terminated', 'Code': 48}},
+        ]})
+        assert host.terminate_launched() is True
+        stub.assert_no_pending_responses()
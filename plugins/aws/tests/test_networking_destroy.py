@@ -0,0 +1,66 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from unittest.mock import MagicMock
+
+from quickhost_aws.AWSNetworking import AWSNetworking
+from quickhost_aws.constants import AWSConstants
+
+
+def _ec2(calls):
+    """
+    A vpc holding one leftover instance, whose network interface doesn't
+    delete on termination and only becomes available once it's terminated.
+    """
+    state = {'instance': 'running'}
+    client = MagicMock()
+
+    def paginate(operation):
+        def _paginate(Filters):
+            filters = {f['Name']: f['Values'] for f in Filters}
+            if operation == 'describe_instances':
+                return [{'Reservations': [{'Instances': [{'InstanceId': 'i-1'}]}] if state['instance'] != 'terminated' else []}]
+            if operation == 'describe_network_interfaces':
+                eni = {'NetworkInterfaceId': 'eni-1', 'Attachment': {'InstanceId': 'i-1'}}
+                eni['Status'] = 'available' if state['instance'] == 'terminated' else 'in-use'
+                if eni['Status'] not in filters.get('status', [eni['Status']]):
+                    return [{'NetworkInterfaces': []}]
+                return [{'NetworkInterfaces': [eni]}]
+            return [{'SecurityGroups': []}]
+        return _paginate
+
+    def terminate():
+        calls.append('terminate')
+        state['instance'] = 'terminated'
+
+    client.get_paginator.side_effect = lambda operation: MagicMock(paginate=paginate(operation))
+    client.describe_route_tables.return_value = {'RouteTables': []}
+    for operation in ['delete_network_interface', 'detach_internet_gateway', 'delete_route_table',
+                      'delete_internet_gateway', 'delete_subnet', 'delete_vpc']:
+        getattr(client, operation).side_effect = lambda operation=operation, **kwargs: calls.append(operation)
+    return client, terminate
+
+
+def test_destroy_deletes_interfaces_freed_by_terminating(aws_env):
+    calls = []
+    net = AWSNetworking(app_name='test', profile=AWSConstants.DEFAULT_IAM_USER, region=AWSConstants.DEFAULT_REGION)
+    net.client, terminate = _ec2(calls)
+    net.describe = lambda use_cache=True: {
+        'vpc_id': 'vpc-1', 'subnet_id': 'subnet-1', 'subnet_ids': ['subnet-1'], 'rt_id': 'rtb-1', 'igw_id': 'igw-1',
+    }
+    net._terminate_leftovers = lambda instance_ids: terminate()
+
+    assert net.destroy()
+    assert calls.index('terminate') < calls.index('delete_network_interface') < calls.index('delete_subnet') < calls.index('delete_vpc')
@@ -0,0 +1,51 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import socket
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from botocore.exceptions import ClientError
+
+from quickhost_aws.probe import ReadinessProbe
+
+
+def test_console_output_error_only_fails_that_host():
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen()
+    port = listener.getsockname()[1]
+    client = MagicMock()
+    client.get_console_output.side_effect = ClientError(
+        {'Error': {'Code': 'UnauthorizedOperation', 'Message': 'nope'}}, 'GetConsoleOutput')
+    hosts = [
+        SimpleNamespace(instance_id='i-linux', public_ip='127.0.0.1', platform=None),
+        SimpleNamespace(instance_id='i-windows', public_ip='127.0.0.1', platform='Windows'),
+    ]
+    try:
+        readiness = ReadinessProbe(
+            hosts,
+            {h.instance_id: [port] for h in hosts},
+            client=client,
+            cloud_init=True,
+            timeout=5,
+            min_delay=0.1,
+        ).run()
+    finally:
+        listener.close()
+    assert readiness['i-linux'].ports[port] is not None
+    assert not readiness['i-linux'].ready
+    # cloud-init isn't checked on windows, so its probe is unaffected
+    assert readiness['i-windows'].ready
@@ -0,0 +1,69 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import pytest
+from botocore.stub import Stubber, ANY
+
+from quickhost_aws.AWSSG import SG
+from quickhost_aws.constants import AWSConstants
+
+MY_IP = '203.0.113.7/32'
+
+
+def _group(ip_permissions):
+    return {'SecurityGroups': [{
+        'GroupId': 'sg-0123456789abcdef0',
+        'GroupName': 'test-app',
+        'VpcId': 'vpc-1',
+        'IpPermissions': ip_permissions,
+    }]}
+
+
+def _rule(port, cidr):
+    return {'IpProtocol': 'tcp', 'FromPort': port, 'ToPort': port, 'IpRanges': [{'CidrIp': cidr}]}
+
+
+@pytest.fixture
+def sg(aws_env):
+    return SG(app_name='test-app', profile=AWSConstants.DEFAULT_IAM_USER, region=AWSConstants.DEFAULT_REGION, vpc_id='vpc-1')
+
+
+@pytest.mark.parametrize('ports, cidrs, authorized', [
+    (None, ['198.51.100.0/24'], [(22, '198.51.100.0/24')]),
+    ([8080], None, [(8080, MY_IP)]),
+])
+def test_update_empty_group_falls_back_to_defaults(sg, ports, cidrs, authorized):
+    with Stubber(sg.client) as stub:
+        stub.add_response('describe_security_groups', _group([]))
+        stub.add_response('authorize_security_group_ingress', {}, {
+            'GroupId': 'sg-0123456789abcdef0',
+            'IpPermissions': [_rule(port, cidr) | {'IpRanges': [{'CidrIp': cidr, 'Description': ANY}]} for port, cidr in authorized],
+        })
+        changes = sg.update(ports=ports, cidrs=cidrs, default_cidrs=[MY_IP])
+        stub.assert_no_pending_responses()
+    assert changes == {'authorized': authorized, 'revoked': []}
+
+
+def test_update_client_error_returns_false(sg):
+    with Stubber(sg.client) as stub:
+        stub.add_response('describe_security_groups', _group([_rule(22, MY_IP)]))
+        stub.add_client_error('authorize_security_group_ingress', 'RulesPerSecurityGroupLimitExceeded')
+        assert sg.update(ports=[22, 443], default_cidrs=[MY_IP]) is False
+
+
+def test_update_describe_error_returns_false(sg):
+    with Stubber(sg.client) as stub:
+        stub.add_client_error('describe_security_groups', 'UnauthorizedOperation')
+        assert sg.update(ports=[22], default_cidrs=[MY_IP]) is False
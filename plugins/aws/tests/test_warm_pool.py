@@ -0,0 +1,90 @@
+# Copyright (C) 2022 zeebrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from botocore.exceptions import ClientError
+
+from quickhost_aws.AWSWarmPool import WarmPool
+from quickhost_aws.constants import AWSConstants
+
+MEMBERS = [f"i-{n:017x}" for n in range(4)]
+
+
+def _ec2(states):
+    """A client whose start_instances moves `states` like ec2 does, one call at a time"""
+    client = MagicMock()
+    lock = threading.Lock()
+
+    def start_instances(InstanceIds):
+        starting = []
+        with lock:
+            for i in InstanceIds:
+                starting.append({
+                    'InstanceId': i,
+                    'PreviousState': {'Name': states[i]},
+                    'CurrentState': {'Name': 'pending'},
+                })
+                states[i] = 'pending'
+        return {'StartingInstances': starting}
+
+    client.start_instances.side_effect = start_instances
+    return client
+
+
+def test_concurrent_claims_do_not_share_members(aws_env):
+    states = {i: 'stopped' for i in MEMBERS}
+    client = _ec2(states)
+    barrier = threading.Barrier(2)
+
+    def _claim(app_name):
+        pool = WarmPool(profile=AWSConstants.DEFAULT_IAM_USER, region=AWSConstants.DEFAULT_REGION, os='ubuntu', instance_type='t2.micro')
+        pool.client = client
+        # both claimers see every member as stopped
+        pool.members = lambda *_: [SimpleNamespace(instance_id=i) for i in MEMBERS]
+        barrier.wait()
+        return pool.claim(app_name, len(MEMBERS), 'sg-0')
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first, second = pool.map(_claim, ['app-1', 'app-2'])
+
+    assert sorted(first + second) == MEMBERS
+    assert not set(first) & set(second)
+    assert all(state == 'pending' for state in states.values())
+
+
+def test_member_that_cannot_be_handed_over_is_terminated(aws_env):
+    states = {i: 'stopped' for i in MEMBERS}
+    client = _ec2(states)
+
+    def modify_instance_attribute(InstanceId, **kwargs):
+        if InstanceId == MEMBERS[1]:
+            raise ClientError({'Error': {'Code': 'InternalError', 'Message': 'oops'}}, 'ModifyInstanceAttribute')
+
+    client.modify_instance_attribute.side_effect = modify_instance_attribute
+    client.terminate_instances.return_value = {'TerminatingInstances': [
+        {'InstanceId': MEMBERS[1], 'CurrentState': {'Name': 'shutting-down'}},
+    ]}
+    pool = WarmPool(profile=AWSConstants.DEFAULT_IAM_USER, region=AWSConstants.DEFAULT_REGION, os='ubuntu', instance_type='t2.micro')
+    pool.client = client
+    pool.members = lambda *_: [SimpleNamespace(instance_id=i) for i in MEMBERS]
+
+    assert pool.claim('app-1', len(MEMBERS), 'sg-0') == [i for i in MEMBERS if i != MEMBERS[1]]
+    client.terminate_instances.assert_called_once_with(InstanceIds=[MEMBERS[1]])
+    tagged = [c.kwargs['Resources'] for c in client.delete_tags.call_args_list]
+    assert [MEMBERS[1]] not in tagged